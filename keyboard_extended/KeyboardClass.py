@@ -1,11 +1,15 @@
+from collections import deque
+from functools import partial
+from itertools import count
 from queue import Queue
 from threading import Thread
 from time import sleep, time
 from typing import Callable, Iterable
-from random import randrange
 
 from keyboard import *
 
+from .hotkeys import parse_hotkey
+
 
 class Key:
     """An instance of this class allows to bind functions to keyboard actions.
@@ -25,6 +29,7 @@ class Key:
 
     all_keys = []
     name_self_dict = {}
+    _identifications = count(1)
     standard_modifiers = frozenset(
         [
             "alt",
@@ -54,7 +59,15 @@ class Key:
         for c in v:
             aliase_di[c] = k
     scancode_self_dict = {}
-    # last_200 = []
+    keys_by_event_name: dict = {}
+    "Name of an event to the keys it updates: the key of that name and the key of its English name if it is a German alias (e.g. strg -> ctrl). Filled on demand, cleared when a key is created."
+    _standard_modifier_keys: tuple = None
+    down_names: set = set()
+    "Names of the keys in the state down."
+    bound_keys: set = set()
+    "The keys with callbacks. The keyboard is hooked while there are any, see _update_hook."
+    last_200 = deque(maxlen=200)
+    "The latest presses as tuples of the names of the pressed key (including aliases) and the names of the keys which were down at that moment. Used by key chains."
 
     time_to_clicks_standard = {
         0.5: 9,
@@ -203,13 +216,19 @@ class Key:
         self.scan_code = scan_code
         self._callbacks_up = []
         self._callbacks_down = []
+        self._compiled_up = ()
+        "The callbacks of _callbacks_up with their arguments bound, see _compile_callbacks."
+        self._compiled_down = ()
         self.active_modifiers = active_modifiers
         self.queue = Queue()
         Key.all_keys.append(self)
         Key.name_self_dict[name] = self
         Key.scancode_self_dict[scan_code] = self
+        Key.keys_by_event_name.clear()
+        Key._standard_modifier_keys = None
         self._alias_bound_timed_functions = {}
         self.key_chains = []
+        self._last_chain_press = None
         upper_f = (
             "f13",
             "f14",
@@ -247,37 +266,66 @@ class Key:
         if value != "up" and value != "down":
             raise ValueError
 
-        self.active_modifiers = [
-            x
-            for x in list(Key.standard_modifiers)
-            if Key.name_self_dict[x].state == "down"
-        ]
+        modifier_keys = Key._standard_modifier_keys
+        if modifier_keys is None:
+            modifier_keys = Key._standard_modifier_keys = tuple(
+                (x, Key.name_self_dict[x]) for x in list(Key.standard_modifiers)
+            )
+        self.active_modifiers = [x for x, key in modifier_keys if key._state == "down"]
 
         self._state = value
-        if value == "up":
-            for c, args, send_self, idendtification in self._callbacks_up:
-                if send_self:
-                    if args != None:
-                        c(self, *args)
-                    else:
-                        c(self)
-                else:
-                    if args != None:
-                        c(*args)
-                    else:
-                        c()
-        elif value == "down":
-            for c, args, send_self, idendtification in self._callbacks_down:
-                if send_self:
-                    if args != None:
-                        c(self, *args)
-                    else:
-                        c(self)
-                else:
-                    if args != None:
-                        c(*args)
-                    else:
-                        c()
+        if value == "down":
+            Key.down_names.add(self._name)
+        else:
+            Key.down_names.discard(self._name)
+        for callback in self._compiled_up if value == "up" else self._compiled_down:
+            callback()
+
+    def _compile_callback(self, callback: Callable, args: Iterable, send_self: bool):
+        if send_self:
+            return partial(callback, self, *(args or ()))
+        if args:
+            return partial(callback, *args)
+        return callback
+
+    def _compile_callbacks(self):
+        "Bind the arguments of the callbacks once, so the state setter calls them without branching."
+        self._compiled_up = tuple(
+            self._compile_callback(c, args, send_self)
+            for c, args, send_self, _ in self._callbacks_up
+        )
+        self._compiled_down = tuple(
+            self._compile_callback(c, args, send_self)
+            for c, args, send_self, _ in self._callbacks_down
+        )
+        if self._compiled_up or self._compiled_down:
+            Key.bound_keys.add(self)
+        else:
+            Key.bound_keys.discard(self)
+        _update_hook()
+
+    @staticmethod
+    def _keys_for_event(name: str, scan_code) -> tuple:
+        "Get the keys an event updates, see keys_by_event_name. Creates the key if it doesn't exist."
+        keys = Key.keys_by_event_name.get(name)
+        if keys is not None:
+            return keys
+        key = Key.name_self_dict.get(name)
+        if key is None:
+            key = Key(name, scan_code=scan_code)
+        alias = Key.aliase_di.get(name)
+        if alias is not None and alias in Key.name_self_dict:
+            keys = (key, Key.name_self_dict[alias])
+        else:
+            keys = (key,)
+        Key.keys_by_event_name[name] = keys
+        return keys
+
+    @staticmethod
+    def _record_press(keys: list):
+        names = tuple(k.name for k in keys)
+        down = frozenset(Key.down_names)
+        Key.last_200.append((names, down))
 
     def bind(
         self,
@@ -289,20 +337,21 @@ class Key:
         """
         callback should be a function; returns idendtification
         """
-        idendtification = time() + randrange(100)
+        idendtification = next(Key._identifications)
         if state == "up":
             self._callbacks_up.append((callback, args, send_self, idendtification))
         elif state == "down":
             self._callbacks_down.append((callback, args, send_self, idendtification))
         else:
             raise ValueError
+        self._compile_callbacks()
         return idendtification
 
     def unbind(
         self,
         callback: Callable = None,
         state: str = "down",
-        idendtification: float = None,
+        idendtification: int = None,
     ):
         if callback == None and idendtification == None:
             raise ValueError("callback and idendtification are None")
@@ -335,6 +384,7 @@ class Key:
                 self._callbacks_down.pop(n)
         else:
             raise ValueError("state must be 'up' or 'down'")
+        self._compile_callbacks()
 
         try:
             for keyname in Key.aliase[self._name]:
@@ -346,12 +396,14 @@ class Key:
     def unbind_all(self):
         self._callbacks_up = []
         self._callbacks_down = []
+        self._compile_callbacks()
 
         try:
             for keyname in Key.aliase[self._name]:
                 key = Key.name_self_dict[keyname]
                 key._callbacks_up = []
                 key._callbacks_down = []
+                key._compile_callbacks()
         except:
             pass
 
@@ -411,30 +463,49 @@ class Key:
 
         return timed_hotkey_caller, timed_hotkey_thread_canceler
 
+    @staticmethod
+    def _parse_key_chain(key_chain: str) -> tuple[tuple[str, ...], ...]:
+        return tuple(tuple(chord.names) for chord in parse_hotkey(key_chain).chords)
+
     def key_chain_binding(self, key_chain: str, callback: Callable):
-        hotkeys = key_chain.split("+")
-        key_chain = key_chain.replace(" ", "")
-        parts = key_chain.split(",")
-        last_key = parts[-1]
-        last_key: Key
-        last_key.bind(last_key._check_key_chain)
-        key_chain = [get_Key(k) for k in parts]
-        get_Key(last_key).key_chains.append((key_chain, callback))
-
-        def remove_key_chain(self, key_chain: str, callback: Callable):
-            key_chain = key_chain.replace(" ", "")
-            parts = key_chain.split(",")
-            last_key = parts[-1]
-            last_key: Key
+        """Call callback when the chords of key_chain are pressed one after another, e.g. "a, b, ctrl+c".
+
+        Args:
+            key_chain (str): The chords seperated by ",", the keys of a chord seperated by "+".
+            callback (Callable): Called without arguments.
+        """
+        chain = Key._parse_key_chain(key_chain)
+        last_key = get_Key(chain[-1][-1])
+        if not last_key.key_chains:
+            last_key.bind(last_key._check_key_chain)
+        last_key.key_chains.append((chain, callback))
+
+    def remove_key_chain(self, key_chain: str, callback: Callable):
+        chain = Key._parse_key_chain(key_chain)
+        last_key = get_Key(chain[-1][-1])
+        last_key.key_chains.remove((chain, callback))
+        if not last_key.key_chains:
             last_key.unbind(last_key._check_key_chain)
-            key_chain = [get_Key(k) for k in parts]
-            get_Key(last_key).key_chains.remove((key_chain, callback))
 
-        def _check_key_chain(self):
-            for key_chain, callback in self.key_chains:
-                len_chain = len(key_chain)
-                if Key.last_200[-1 * len_chain :] == key_chain:
-                    callback()
+    def _check_key_chain(self):
+        presses = list(Key.last_200)
+        if not presses or presses[-1] is self._last_chain_press:
+            return  # a repeat, not a new press
+        self._last_chain_press = presses[-1]
+        for key_chain, callback in self.key_chains:
+            position = len(presses) - 1
+            for chord in reversed(key_chain):
+                *held, pressed = chord
+                if position < 0:
+                    break
+                names, down = presses[position]
+                if pressed not in names or not down.issuperset(held):
+                    break
+                position -= 1
+                while position >= 0 and any(n in held for n in presses[position][0]):
+                    position -= 1  # the presses of the held keys belong to this chord
+            else:
+                callback()
 
     def timed_hotkey_clickrate_based(
         self,
@@ -779,27 +850,12 @@ def keyboard_hook_callback(event: KeyboardEvent):
     """
 
     if round(time() - event.time, 2) < 0.1:
-        # try: key = Key.name_self_dict[event.name]
-        # except: key = Key(event.name, scan_code=event.scan_code)
-
-        keys = []
-        try:
-            key = Key.name_self_dict[event.name]
-            keys.append(key)
-        except:
-            key = Key(event.name, scan_code=event.scan_code)
-            keys.append(key)
+        keys = Key.keys_by_event_name.get(event.name)
+        if keys is None:
+            keys = Key._keys_for_event(event.name, event.scan_code)
 
-        try:
-            try:
-                name = Key.aliase_di[event.name]
-                # print(name)
-            except:
-                name = Key.aliase[event.name]
-            key = Key.name_self_dict[name]
-            keys.append(key)
-        except:
-            pass
+        if event.event_type == "down" and keys[0]._last_state != "down":
+            Key._record_press(keys)
 
         for key in keys:
             key: Key
@@ -826,20 +882,12 @@ def keyboard_hook_callback_with_callbacks_queued(event: KeyboardEvent):
     Attribute: name, device, event_type, is_keypad, modifiers, scan_code, time
     Reguläre: name, event_type, is_keypad
     """
-    keys = []
-    try:
-        key = Key.name_self_dict[event.name]
-        keys.append(key)
-    except:
-        key = Key(event.name, scan_code=event.scan_code)
-        keys.append(key)
+    keys = Key.keys_by_event_name.get(event.name)
+    if keys is None:
+        keys = Key._keys_for_event(event.name, event.scan_code)
 
-    try:
-        name = Key.aliase_di[event.name]
-        key = Key.name_self_dict[name]
-        keys.append(key)
-    except:
-        pass
+    if event.event_type == "down" and keys[0].up_time > keys[0].down_time:
+        Key._record_press(keys)
 
     for key in keys:
         key: Key
@@ -866,15 +914,41 @@ def on_unhook():
     print("Keyboard unhooked")
 
 
+_hooked = False
+"Whether keyboard_hook_callback is hooked."
+_hooked_by_init = False
+
+
+def _update_hook():
+    """Hook the keyboard while any key has callbacks or init was called and unhook it otherwise, so no event is processed without a reason.
+
+    Events are missed while unhooked, so the keys held down then are reset to up without calling their callbacks.
+    """
+    global _hooked
+    needed = _hooked_by_init or bool(Key.bound_keys)
+    if needed and not _hooked:
+        for key in Key.all_keys:
+            if key._state == "down":
+                key._state = key._last_state = "up"
+        Key.down_names.clear()
+        hook(keyboard_hook_callback)
+        _hooked = True
+    elif not needed and _hooked:
+        unhook(keyboard_hook_callback)
+        _hooked = False
+
+
 def init():
+    "Hook the keyboard right away and keep it hooked, e.g. to read the state of keys without callbacks."
+    global _hooked, _hooked_by_init
     try:
         unhook(keyboard_hook_callback_with_callbacks_queued)
     except:
         pass
+    if _hooked:
+        unhook(keyboard_hook_callback)
     hook(keyboard_hook_callback, on_remove=on_unhook)
-
-
-init()
+    _hooked = _hooked_by_init = True
 
 
 if __name__ == "__main__":
@@ -1,5 +1,15 @@
 # from .KeyboardClass import Key, get_Key, getKey, unbind_all_hotkeys
 from keyboard import *
-from .keyboard_extended import KeyboardListener, Key, Binding, bind_hotkey, bind_hotkey_hold, bind_hotkey_multipress, remove_binding, remove_all_bindings
+from .keyboard_extended import KeyboardListener, KeyRegistry, default_registry, Key, Binding, bind_hotkey, bind_hotkey_hold, bind_hotkey_multipress, remove_binding, remove_all_bindings
+from .backends import InputBackend, KeyboardHookBackend, MemoryBackend, EvdevFileBackend, read_input_events
+from .hotkeys import ChordSpec, HotkeySpec, HotkeySyntaxError, KeySpec, parse_hotkey
+from .snapshot import KeyStateSnapshot
+from .metrics import MetricsWindow, TypingMetrics
+from .gestures import GestureEngine, parse_gesture
+from .artifacts import BindingArtifact, compile_bindings, load_bindings
+from .stats import LagStats, P2Quantile
+from .tracing import Tracer, TraceRecord, RingBufferSink, HookProfiler
+from .watchdog import CallbackStats, CallbackWatchdog
+from .admission import AdmissionControl
 
 __version__ = "0.2.4"
@@ -0,0 +1,217 @@
+import contextlib
+import platform
+import threading
+import typing
+from collections import Counter
+from time import time
+
+from keyboard import KeyboardEvent, key_to_scan_codes, parse_hotkey, send, write
+
+ADMIT = "admit"
+"Handle the event as usual."
+STATE_ONLY = "state_only"
+"Only update the state of the key, no observer or binding is called."
+DROP = "drop"
+"Ignore the event."
+
+shed_policies = ("unbound", "repeats")
+
+
+class AdmissionControl:
+    """Decide at the top of the hook which events get the full handling, so bursts of events (e.g. keyboard.write typing a long text) don't starve real hotkeys. Pass it to `KeyboardListener(admission=...)`.
+
+    - Stale events: an event older than the largest max_delay of the bindings (or the adaptive max_delay) can't fire any binding. Stale events only update the key state, so no key gets stuck and the bindings see the same states as without admission control.
+    - Injected events: admission.write and admission.send tag the keys they send and drop their events. The tags are matched by scan code (by name for text typed as unicode) and only within an injection window, which is matched by the time of the events and stays open for injection_grace seconds after the keys were sent. The other events in the window, e.g. the modifiers keyboard.write presses or real keystrokes, only update the key state, so no key gets stuck and nothing fires. `with admission.injecting():` opens a window without tags for keys sent by other means.
+    - Backlog: while more than max_backlog events wait in the queue of a threaded listener, events are shed: policy "unbound" lets the events of keys no binding uses only update the key state, policy "repeats" drops the key repeats. "unbound" never changes which bindings fire but skips the observers, shedding repeats can make a binding miss when its held keys aren't refreshed within max_delay.
+
+    Args:
+        stale_after (float, optional): Events older than this are stale. Stale events aren't passed to the observers of the listener. Defaults to None, which means the largest max_delay of the bindings of the registry - then staleness never changes which bindings fire. Without bindings no event is stale.
+        max_backlog (int, optional): The queue length above which events are shed, None disables shedding. Defaults to 256.
+        shed_policy (str, optional): "unbound" or "repeats". Defaults to "unbound".
+        injection_grace (float, optional): Seconds an injection window stays open after the block was left, for the events still on their way to the hook. Defaults to 0.05.
+    """
+
+    def __init__(
+        self,
+        stale_after: float = None,
+        max_backlog: int = 256,
+        shed_policy: str = "unbound",
+        injection_grace: float = 0.05,
+    ) -> None:
+        if shed_policy not in shed_policies:
+            raise ValueError(f"shed_policy must be one of {shed_policies}")
+        self.stale_after = stale_after
+        self.max_backlog = max_backlog
+        self.shed_policy = shed_policy
+        self.injection_grace = injection_grace
+        self.admitted = 0
+        self.stale = 0
+        "Stale events that only updated the key state."
+        self.injected_dropped = 0
+        "Tagged events of keys sent by write or send."
+        self.injected_state_only = 0
+        "Untagged events inside an injection window that only updated the key state."
+        self.shed_dropped = 0
+        "Repeats dropped because of the backlog."
+        self.shed_state_only = 0
+        "Events of unbound keys that only updated the key state because of the backlog."
+        self.registry = None
+        self._max_delay = 0.0
+        "the largest max_delay of the bindings of the registry"
+        self._bound_names: frozenset = frozenset()
+        self._bound_scan_codes: frozenset = frozenset()
+        "names and scan codes of the keys used by bindings, matched like the user keys of the listener"
+        self._bindings_dirty = False
+        "The bindings changed since the aggregates above were built."
+        self._lock = threading.Lock()
+        self._injecting = 0
+        self._inject_start = float("inf")
+        self._inject_end = float("-inf")
+        self._tags: Counter = Counter()
+        "(scan code or name, event type) of the events sent by write and send that weren't seen yet, guarded by _lock"
+
+    @property
+    def dropped(self) -> int:
+        "All events dropped or reduced to a state update."
+        return (
+            self.stale
+            + self.injected_dropped
+            + self.injected_state_only
+            + self.shed_dropped
+            + self.shed_state_only
+        )
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "admitted": self.admitted,
+            "stale": self.stale,
+            "injected_dropped": self.injected_dropped,
+            "injected_state_only": self.injected_state_only,
+            "shed_dropped": self.shed_dropped,
+            "shed_state_only": self.shed_state_only,
+        }
+
+    def __str__(self) -> str:
+        return f"AdmissionControl object: {self.as_dict()}"
+
+    def attach(self, registry):
+        "Follow the max_delay of the bindings of the registry, called by the KeyboardListener."
+        self.registry = registry
+        with registry.lock:
+            registry.binding_watchers += (self._bindings_changed,)
+            self._bindings_changed()
+
+    def _bindings_changed(self, *_):
+        "A binding watcher. The aggregates are rebuilt by the next admit, so adding or removing many bindings stays linear."
+        self._bindings_dirty = True
+
+    def _update_aggregates(self):
+        self._bindings_dirty = False  # before reading, so a change meanwhile marks them again
+        bindings = list(self.registry.bindings.values())  # a single copy, writers may change the dict meanwhile
+        self._max_delay = max((b.max_delay for b in bindings), default=0.0)
+        keys = {k for b in bindings for k in b.keys}
+        self._bound_names = frozenset(k.name for k in keys)
+        self._bound_scan_codes = frozenset(
+            c
+            for k in keys
+            for c in (k.scan_code if isinstance(k.scan_code, (tuple, list)) else (k.scan_code,))
+        )
+
+    @contextlib.contextmanager
+    def injecting(self, tags: typing.Iterable[tuple] = ()):
+        """Open an injection window for the keys sent inside the block, see the class docstring.
+
+        Args:
+            tags (typing.Iterable[tuple], optional): (scan code or name, event type) of the events that will be sent, they are dropped. Defaults to (), which means all events in the window only update the key state.
+        """
+        with self._lock:
+            if not self._injecting:
+                if self._inject_end < time():
+                    self._tags.clear()  # left over from an earlier window
+                self._inject_start = time()
+                self._inject_end = float("inf")
+            self._injecting += 1
+            self._tags.update(tags)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._injecting -= 1
+                if not self._injecting:
+                    self._inject_end = time() + self.injection_grace
+
+    def write(self, text: str, delay: float = 0, restore_state_after: bool = True, exact: bool = None):
+        "keyboard.write with the keys of the text tagged as injected."
+        if exact is None:
+            exact = platform.system() == "Windows"  # the default of keyboard.write
+        tags = []
+        for letter in text:
+            scan_codes = () if exact and letter not in "\n\b" else key_to_scan_codes(letter, False)
+            tag = scan_codes[0] if scan_codes else letter
+            tags += ((tag, "down"), (tag, "up"))
+        with self.injecting(tags):
+            write(text, delay, restore_state_after, exact)
+
+    def send(self, hotkey, do_press: bool = True, do_release: bool = True):
+        "keyboard.send with the keys of the hotkey tagged as injected."
+        tags = [
+            (scan_codes[0], event_type)
+            for step in parse_hotkey(hotkey)
+            for scan_codes in step
+            for event_type, sent in (("down", do_press), ("up", do_release))
+            if sent
+        ]
+        with self.injecting(tags):
+            send(hotkey, do_press, do_release)
+
+    def _take_tag(self, event: KeyboardEvent) -> bool:
+        "Whether the event was sent by write or send, its tag is used up then."
+        with self._lock:
+            tags = self._tags
+            for tag in ((event.scan_code, event.event_type), (event.name, event.event_type)):
+                if tags[tag]:
+                    tags[tag] -= 1
+                    return True
+        return False
+
+    def admit(
+        self, event: KeyboardEvent, lag: float, backlog: int = 0, get_key: typing.Callable = None
+    ) -> str:
+        """Decide how the event is handled.
+
+        Args:
+            event (KeyboardEvent): The event.
+            lag (float): Seconds since the event happened.
+            backlog (int, optional): The amount of events waiting behind it. Defaults to 0.
+            get_key (typing.Callable, optional): Resolves the event to its Key, which tells repeats: an event of the state the key is already in. Only called while shedding with policy "repeats", without it no event is a repeat. Defaults to None.
+
+        Returns:
+            str: ADMIT, STATE_ONLY or DROP.
+        """
+        if self._inject_start <= event.time <= self._inject_end:
+            if self._take_tag(event):
+                self.injected_dropped += 1
+                return DROP
+            self.injected_state_only += 1
+            return STATE_ONLY
+        if self._bindings_dirty:
+            self._update_aggregates()
+        stale_after = self.stale_after
+        if stale_after is None:
+            stale_after = self._max_delay
+            adaptive = self.registry.adaptive_max_delay if self.registry is not None else None
+            if adaptive is not None and adaptive > stale_after:
+                stale_after = adaptive
+        if stale_after and lag >= stale_after:
+            self.stale += 1
+            return STATE_ONLY
+        if self.max_backlog is not None and backlog > self.max_backlog:
+            if self.shed_policy == "repeats":
+                if get_key is not None and get_key(event).state == event.event_type:
+                    self.shed_dropped += 1
+                    return DROP
+            elif not (event.name in self._bound_names or event.scan_code in self._bound_scan_codes):
+                self.shed_state_only += 1
+                return STATE_ONLY
+        self.admitted += 1
+        return ADMIT
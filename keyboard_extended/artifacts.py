@@ -0,0 +1,298 @@
+"""Compile binding configurations once and cache the result on disk, so registering thousands of hotkeys at startup skips parsing and scan code lookups.
+
+A configuration maps a name to a dict with the "type" ("normal", "hold" or "multipress") and the keyword arguments of the matching bind function, like keyboard_extended.offline.evaluate_bindings. The callback is looked up by the name of the entry, or by its "callback" item:
+
+    config = {
+        "copy": {"type": "normal", "keys": "ctrl+c"},
+        "panic": {"type": "multipress", "keys": "esc*3@0.6s"},
+        "dictate": {"type": "hold", "keys": "f9~0.5s", "callback": "start_dictation"},
+    }
+    ids = load_bindings(config, {"copy": copy, "panic": panic, "start_dictation": dictate})
+
+The artifact is keyed by a hash of the configuration and by the keyboard layout, since the scan codes of the key names depend on it. Everything in a configuration must be JSON serializable.
+"""
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import typing
+
+from keyboard import key_to_scan_codes
+
+from .hotkeys import parse_chord
+from .keyboard_extended import (
+    Key,
+    bind_hotkey,
+    bind_hotkey_hold,
+    bind_hotkey_multipress,
+    default_registry,
+)
+
+artifact_version = 1
+"Increased whenever the format of the artifacts changes, older artifacts are compiled again."
+
+_kinds = {
+    "normal": ("normal",),
+    "hold": ("normal", "hold"),
+    "multipress": ("normal", "multipress"),
+}
+"type of an entry to the kinds of chords its keys may be"
+
+_bind_functions = {
+    "normal": bind_hotkey,
+    "hold": bind_hotkey_hold,
+    "multipress": bind_hotkey_multipress,
+}
+
+_layout_probe = "abcdefghijklmnopqrstuvwxyz0123456789-=[];'\\,./`"
+
+
+def config_hash(config: dict) -> str:
+    "Hash of a binding configuration, independent of the order of its items."
+    text = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def layout_fingerprint() -> str:
+    "Identify the keyboard layout by the scan codes of the printable keys of a US keyboard."
+    codes = [key_to_scan_codes(c, False) for c in _layout_probe]
+    text = json.dumps([sys.platform, [list(c) for c in codes]])
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def default_cache_dir() -> str:
+    "$XDG_CACHE_HOME/keyboard_extended or ~/.cache/keyboard_extended."
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "keyboard_extended")
+
+
+class BindingArtifact:
+    """A compiled binding configuration: the hotkey strings parsed, the modifiers of the chords applied and the scan codes of the keys resolved.
+
+    Args:
+        config_hash (str): See config_hash.
+        layout (str): See layout_fingerprint.
+        keys (list[tuple[str, bool, tuple[int, ...]]]): The distinct keys as name, is_keypad and scan codes.
+        entries (list[dict]): The compiled entries, see compile_bindings.
+    """
+
+    def __init__(
+        self,
+        config_hash: str,
+        layout: str,
+        keys: list[tuple[str, bool, tuple[int, ...]]],
+        entries: list[dict],
+    ) -> None:
+        self.config_hash = config_hash
+        self.layout = layout
+        self.keys = keys
+        self.entries = entries
+
+    def __str__(self) -> str:
+        return f"BindingArtifact object: config_hash: {self.config_hash[:12]}, layout: {self.layout}, len(keys): {len(self.keys)}, len(entries): {len(self.entries)}"
+
+    def to_dict(self) -> dict:
+        return {
+            "version": artifact_version,
+            "config_hash": self.config_hash,
+            "layout": self.layout,
+            "keys": [[n, kp, list(codes)] for n, kp, codes in self.keys],
+            "entries": self.entries,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BindingArtifact":
+        if data.get("version") != artifact_version:
+            raise ValueError(f"unsupported artifact version {data.get('version')}")
+        return cls(
+            data["config_hash"],
+            data["layout"],
+            [(n, kp, tuple(codes)) for n, kp, codes in data["keys"]],
+            data["entries"],
+        )
+
+    def save(self, path: str):
+        "Write the artifact to path atomically, so concurrent readers never see a partial file."
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "BindingArtifact":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def install(
+        self, callbacks: typing.Mapping[str, typing.Callable], registry=None
+    ) -> dict[str, int]:
+        """Add the bindings to the registry in a single batch.
+
+        Args:
+            callbacks (typing.Mapping[str, typing.Callable]): The callbacks by the names used in the configuration.
+            registry (KeyRegistry, optional): Defaults to None, which means the default registry.
+
+        Raises:
+            KeyError: If a callback is missing, nothing is added then.
+
+        Returns:
+            dict[str, int]: Name of the entry to the id of its binding, see remove_binding.
+        """
+        if registry is None:
+            registry = default_registry
+        resolved = [callbacks[e["callback"]] for e in self.entries]
+        ids = {}
+        with registry.batch():
+            for name, is_keypad, scan_codes in self.keys:
+                if (name, is_keypad) not in registry.user_key_index:
+                    Key._from_name(name, is_keypad, registry, scan_codes)
+            for entry, callback in zip(self.entries, resolved):
+                ids[entry["name"]] = _bind_functions[entry["type"]](
+                    callback=callback, registry=registry, **entry["kwargs"]
+                )
+        return ids
+
+
+def compile_bindings(config: dict, layout: str = None) -> BindingArtifact:
+    """Compile a binding configuration, see the module docstring.
+
+    Entries whose keys share one device are compiled to the keys_to_... arguments of the bind functions, so installing them needs no parsing. Entries with suppress or keys on different devices keep their hotkey string.
+
+    Args:
+        config (dict): Name of the entry to its type and keyword arguments.
+        layout (str, optional): See layout_fingerprint. Defaults to None, which means the current layout.
+
+    Raises:
+        HotkeySyntaxError: If a hotkey string doesn't follow the grammar.
+        ValueError: If a chord modifier doesn't fit the type of an entry or a key name is unknown.
+
+    Returns:
+        BindingArtifact: The compiled configuration.
+    """
+    keys: dict[tuple[str, bool], tuple[int, ...]] = {}
+    entries = []
+    for name, entry in config.items():
+        kwargs = dict(entry)
+        _type = kwargs.pop("type", "normal")
+        callback = kwargs.pop("callback", name)
+        if "keys" in kwargs and not any(k.startswith("keys_to_") for k in kwargs):
+            chord = parse_chord(kwargs["keys"], _kinds[_type])
+            is_keypad = kwargs.get("is_keypad", False)
+            device = kwargs.get("device")
+            specs = [
+                (
+                    k.name,
+                    is_keypad if k.is_keypad is None else k.is_keypad,
+                    device if k.device is None else k.device,
+                )
+                for k in chord.keys
+            ]
+            for key_name, kp, _ in specs:
+                if (key_name, kp) not in keys:
+                    keys[(key_name, kp)] = tuple(key_to_scan_codes(key_name))
+            devices = {d for _, _, d in specs}
+            names = [n for n, _, _ in specs]
+            if (
+                len(devices) == 1
+                and len(set(names)) == len(names)
+                and not kwargs.get("suppress")
+            ):
+                kwargs.pop("is_keypad", None)
+                kwargs["device"] = devices.pop()
+                kwargs["keys"] = None
+                _compile_keys(_type, chord, specs, kwargs)
+        kwargs.setdefault("keys", None)
+        entries.append(
+            {"name": name, "type": _type, "callback": callback, "kwargs": kwargs}
+        )
+    return BindingArtifact(
+        config_hash(config),
+        layout_fingerprint() if layout is None else layout,
+        [(n, kp, codes) for (n, kp), codes in keys.items()],
+        entries,
+    )
+
+
+_defaults = {
+    _type: {
+        name: parameter.default
+        for name, parameter in inspect.signature(function).parameters.items()
+    }
+    for _type, function in _bind_functions.items()
+}
+"type to the default arguments of its bind function"
+
+
+def _pop_argument(kwargs: dict, _type: str, name: str):
+    "Remove an argument of the bind function of the type from kwargs, its default if it is not given."
+    return kwargs.pop(name, _defaults[_type][name])
+
+
+def _compile_keys(_type: str, chord, specs: list, kwargs: dict):
+    "Replace the hotkey string of an entry with the keys_to_... argument of its bind function."
+    if _type == "normal":
+        state = _pop_argument(kwargs, _type, "state")
+        kwargs["keys_to_states"] = {n: [state, kp] for n, kp, _ in specs}
+    elif _type == "hold":
+        time_span = _pop_argument(kwargs, _type, "time_span")
+        if chord.time_span is not None:
+            time_span = chord.time_span
+        kwargs["keys_to_hold_times"] = {n: [time_span, kp] for n, kp, _ in specs}
+    else:
+        settings = {
+            "state": _pop_argument(kwargs, _type, "state"),
+            "time_span": _pop_argument(kwargs, _type, "time_span"),
+            "presses": _pop_argument(kwargs, _type, "presses"),
+        }
+        if chord.time_span is not None:
+            settings["time_span"] = chord.time_span
+        if chord.presses is not None:
+            settings["presses"] = chord.presses
+        kwargs["keys_to_multipress_times"] = {
+            n: {**settings, "is_keypad": kp} for n, kp, _ in specs
+        }
+
+
+def load_bindings(
+    config: dict,
+    callbacks: typing.Mapping[str, typing.Callable],
+    registry=None,
+    cache_dir: str = None,
+    layout: str = None,
+) -> dict[str, int]:
+    """Add the bindings of a configuration, compiled once per configuration and layout and cached on disk.
+
+    Args:
+        config (dict): See the module docstring.
+        callbacks (typing.Mapping[str, typing.Callable]): The callbacks by the names used in the configuration.
+        registry (KeyRegistry, optional): Defaults to None, which means the default registry.
+        cache_dir (str, optional): Where the artifacts are kept. Defaults to None, which means default_cache_dir().
+        layout (str, optional): See layout_fingerprint. Defaults to None, which means the current layout.
+
+    Returns:
+        dict[str, int]: Name of the entry to the id of its binding.
+    """
+    layout = layout_fingerprint() if layout is None else layout
+    path = os.path.join(
+        default_cache_dir() if cache_dir is None else cache_dir,
+        f"{config_hash(config)}-{layout}.json",
+    )
+    try:
+        artifact = BindingArtifact.load(path)
+    except (OSError, ValueError, KeyError, TypeError):  # missing, corrupt or outdated
+        artifact = compile_bindings(config, layout)
+        try:
+            artifact.save(path)
+        except OSError:
+            pass  # a read-only cache only costs the compilation
+    return artifact.install(callbacks, registry)
@@ -0,0 +1,299 @@
+import struct
+import threading
+import typing
+from time import time
+
+from keyboard import KeyboardEvent, hook, is_pressed, unhook
+
+
+class InputBackend:
+    """Source of keyboard events for a KeyboardListener.
+
+    A backend calls the callback of the listener with a KeyboardEvent for every event. With suppress=True the return value of the callback tells whether the event may pass (False means suppress it), backends which can't suppress ignore it.
+    """
+
+    def start(self, callback: typing.Callable, suppress: bool = False):
+        "Start passing events to callback."
+        raise NotImplementedError
+
+    def stop(self):
+        "Stop passing events to the callback."
+        raise NotImplementedError
+
+    def is_pressed(self, scan_code: int) -> bool:
+        "Whether the key with the scan code is down right now, used to correct the key states after the listener was unhooked. Backends which can't tell report all keys as up."
+        return False
+
+
+class KeyboardHookBackend(InputBackend):
+    "The global hook of the keyboard package, the default backend. Needs root on Linux."
+
+    def __init__(self) -> None:
+        self._remove = None
+
+    def start(self, callback: typing.Callable, suppress: bool = False):
+        self._remove = hook(callback, suppress=suppress)
+
+    def stop(self):
+        if self._remove is not None:
+            self._remove = unhook(self._remove)
+
+    def is_pressed(self, scan_code: int) -> bool:
+        return is_pressed(scan_code)
+
+
+class MemoryBackend(InputBackend):
+    """Events pushed by the program, e.g. for tests and benchmarks without a keyboard. The events are passed to the listener on the pushing thread.
+
+    Example:
+        backend = MemoryBackend()
+        listener = KeyboardListener(backend=backend)
+        backend.push_many(backend.make_events("a", 100000))
+    """
+
+    synthetic_scan_codes = 0x10000
+    "The scan codes of make_events start here, above those of any real key, so the events are resolved to keys by name only."
+
+    def __init__(self) -> None:
+        self._callback = None
+
+    def start(self, callback: typing.Callable, suppress: bool = False):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def push(self, event: KeyboardEvent) -> bool:
+        """Pass a single event to the listener.
+
+        Returns:
+            bool: False if the listener suppressed the event.
+        """
+        callback = self._callback
+        if callback is None:
+            return True
+        return callback(event) is not False
+
+    def push_many(self, events: typing.Iterable[KeyboardEvent]) -> int:
+        """Pass many events to the listener as fast as possible.
+
+        Returns:
+            int: The amount of events passed.
+        """
+        callback = self._callback
+        if callback is None:
+            return 0
+        count = 0
+        for event in events:
+            callback(event)
+            count += 1
+        return count
+
+    @staticmethod
+    def make_event(
+        name: str,
+        event_type: str = "down",
+        scan_code: int = None,
+        _time: float = None,
+        device=None,
+        is_keypad: bool = False,
+    ) -> KeyboardEvent:
+        "Create a KeyboardEvent, the scan code defaults to 0 and the time to now."
+        return KeyboardEvent(
+            event_type,
+            0 if scan_code is None else scan_code,
+            name,
+            time() if _time is None else _time,
+            device,
+            is_keypad=is_keypad,
+        )
+
+    @staticmethod
+    def make_events(names: str | list[str], amount: int, _time: float = None) -> list[KeyboardEvent]:
+        """Create amount events alternating down and up of the given keys in turn, timestamped now. The scan code of a key is synthetic_scan_codes plus its position in names - real scan codes would resolve e.g. the first name to a bound "esc" (scan code 1).
+
+        Args:
+            names (str | list[str]): A key name or a list of them.
+            amount (int): The amount of events.
+        """
+        names = [names] if isinstance(names, str) else list(names)
+        now = time() if _time is None else _time
+        events = []
+        for i in range(amount):
+            index = (i // 2) % len(names)
+            event_type = "down" if i % 2 == 0 else "up"
+            events.append(
+                KeyboardEvent(
+                    event_type,
+                    MemoryBackend.synthetic_scan_codes + index,
+                    names[index],
+                    now,
+                    is_keypad=False,
+                )
+            )
+        return events
+
+
+EV_KEY = 1
+"Type of the key events of Linux input_event structs."
+
+evdev_key_names: dict[int, tuple[str, bool]] = {
+    1: ("esc", False),
+    **{code: (str((code - 1) % 10), False) for code in range(2, 12)},
+    12: ("-", False),
+    13: ("=", False),
+    14: ("backspace", False),
+    15: ("tab", False),
+    **{16 + i: (c, False) for i, c in enumerate("qwertyuiop")},
+    26: ("[", False),
+    27: ("]", False),
+    28: ("enter", False),
+    29: ("ctrl", False),
+    **{30 + i: (c, False) for i, c in enumerate("asdfghjkl")},
+    39: (";", False),
+    40: ("'", False),
+    41: ("`", False),
+    42: ("shift", False),
+    43: ("\\", False),
+    **{44 + i: (c, False) for i, c in enumerate("zxcvbnm")},
+    51: (",", False),
+    52: (".", False),
+    53: ("/", False),
+    54: ("right shift", False),
+    55: ("*", True),
+    56: ("alt", False),
+    57: ("space", False),
+    58: ("caps lock", False),
+    **{59 + i: (f"f{i + 1}", False) for i in range(10)},
+    69: ("num lock", False),
+    70: ("scroll lock", False),
+    **{71 + i: (c, True) for i, c in enumerate(["7", "8", "9", "-", "4", "5", "6", "+", "1", "2", "3", "0", "."])},
+    87: ("f11", False),
+    88: ("f12", False),
+    96: ("enter", True),
+    97: ("right ctrl", False),
+    98: ("/", True),
+    99: ("print screen", False),
+    100: ("alt gr", False),
+    102: ("home", False),
+    103: ("up", False),
+    104: ("page up", False),
+    105: ("left", False),
+    106: ("right", False),
+    107: ("end", False),
+    108: ("down", False),
+    109: ("page down", False),
+    110: ("insert", False),
+    111: ("delete", False),
+    119: ("pause", False),
+    125: ("left windows", False),
+    126: ("right windows", False),
+    127: ("menu", False),
+}
+"Linux key code to the name used by the keyboard package and whether the key is on the keypad, for the common keys of a US layout."
+
+
+def read_input_events(
+    path: str,
+    names: dict[int, tuple[str, bool]] = None,
+    struct_format: str = "llHHi",
+) -> typing.Iterator[KeyboardEvent]:
+    """Read the key events of a recorded Linux input_event stream, e.g. a copy of /dev/input/eventX.
+
+    Args:
+        path (str): The file.
+        names (dict[int, tuple[str, bool]], optional): Key code to name and is_keypad. Defaults to None, which means evdev_key_names. Unknown codes get their code as name.
+        struct_format (str, optional): The struct of an input_event: seconds, microseconds, type, code and value. Defaults to "llHHi", the layout of 64 bit systems.
+
+    Yields:
+        KeyboardEvent: The event with the key code as scan code, value 0 as "up" and 1 and 2 (repeat) as "down".
+    """
+    names = evdev_key_names if names is None else names
+    record = struct.Struct(struct_format)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(record.size * 4096)
+            if len(data) < record.size:
+                return
+            for seconds, microseconds, _type, code, value in record.iter_unpack(
+                data[: len(data) - len(data) % record.size]
+            ):
+                if _type != EV_KEY:
+                    continue
+                name, is_keypad = names.get(code, (str(code), False))
+                yield KeyboardEvent(
+                    "up" if value == 0 else "down",
+                    code,
+                    name,
+                    seconds + microseconds / 1e6,
+                    path,
+                    is_keypad=is_keypad,
+                )
+
+
+class EvdevFileBackend(InputBackend):
+    """Replay a recorded Linux input_event stream, see read_input_events.
+
+    Args:
+        path (str): The file.
+        realtime (bool, optional): Keep the time between the events and stamp them with the current time. Otherwise the events keep their recorded time and are passed as fast as possible - bindings with a max_delay won't fire then, which is fine to measure the throughput. Defaults to False.
+        names (dict[int, tuple[str, bool]], optional): Key code to name and is_keypad. Defaults to None, which means evdev_key_names.
+        struct_format (str, optional): The struct of an input_event. Defaults to "llHHi".
+    """
+
+    def __init__(
+        self,
+        path: str,
+        realtime: bool = False,
+        names: dict[int, tuple[str, bool]] = None,
+        struct_format: str = "llHHi",
+    ) -> None:
+        self.path = path
+        self.realtime = realtime
+        self.names = names
+        self.struct_format = struct_format
+        self.count = 0
+        "The amount of events passed so far."
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def start(self, callback: typing.Callable, suppress: bool = False):
+        "Start replaying the file on a background thread."
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self.run,
+            args=(callback,),
+            name="keyboard_extended evdev replay",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def run(self, callback: typing.Callable):
+        "Replay the file on the current thread."
+        events = read_input_events(self.path, self.names, self.struct_format)
+        stop = self._stop
+        offset = None
+        for event in events:
+            if stop.is_set():
+                return
+            if self.realtime:
+                now = time()
+                if offset is None:
+                    offset = now - event.time
+                delay = event.time + offset - now
+                if delay > 0 and stop.wait(delay):
+                    return
+                event.time = time()
+            callback(event)
+            self.count += 1
+
+    def join(self, timeout: float = None):
+        "Wait until the whole file was replayed."
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
@@ -0,0 +1,494 @@
+"""Differential fuzzing of the ways bindings are evaluated.
+
+Random event streams and binding sets are run under a virtual clock through a reference and through other engines - the plain, threaded and traced listener paths, bindings installed from a BindingArtifact, the NumPy evaluator of keyboard_extended.offline or any engine of your own. Every engine has to report the same fires. Run it before switching an optimized path on:
+
+    python -m keyboard_extended.fuzzing --iterations 200 --seed 1
+
+The reference is frozen here and doesn't share any evaluation code with the listener: string key states, every binding of a key checked on every event, no bitsets, buckets or latch resets. So a change of Key.update or Binding.check_conditions can't slip through by changing the reference as well.
+
+A mismatch raises FuzzMismatch with a shrunk case that still reproduces it. Fires are compared as (index of the event, name of the binding), sorted, so the order of bindings firing on the same event doesn't matter.
+"""
+import contextlib
+import random
+import sys
+import threading
+import typing
+
+from keyboard import KeyboardEvent, key_to_scan_codes
+
+from . import keyboard_extended as _engine
+from .artifacts import compile_bindings
+from .backends import MemoryBackend
+from .hotkeys import parse_chord
+from .keyboard_extended import KeyboardListener, KeyRegistry
+from .tracing import Tracer
+
+steps = (0.001, 0.004, 0.02, 0.049, 0.05, 0.051, 0.099, 0.1, 0.101, 0.2, 0.35, 0.6, 1.3)
+"The time between two events is one of these, chosen to hit the edges of the rounding to 0.1 s and of typical max_delay, time_span and hold times."
+
+devices = ("kbd1", "kbd2")
+"The devices of the events and bindings with variation."
+
+
+class FuzzCase:
+    """Events and bindings to run through the engines.
+
+    Args:
+        seed (int): The seed the case was generated with.
+        events (list[tuple[float, str, str, float, typing.Any, bool, typing.Any]]): Time, key name, event type, lag, scan code, is_keypad and device of every event. The lag is how long after its time the event reaches the listener. A scan code given as string is the first scan code of the key with that name.
+        bindings (dict): Name to binding configuration, the format of keyboard_extended.artifacts.
+    """
+
+    def __init__(self, seed: int, events: list[tuple], bindings: dict) -> None:
+        self.seed = seed
+        self.events = events
+        self.bindings = bindings
+
+    def __str__(self) -> str:
+        lines = [f"FuzzCase seed {self.seed}: {len(self.events)} events, {len(self.bindings)} bindings"]
+        lines += [f"    {name}: {config}" for name, config in self.bindings.items()]
+        lines += [f"    {i}: {e}" for i, e in enumerate(self.events)]
+        return "\n".join(lines)
+
+
+class FuzzMismatch(AssertionError):
+    "Raised when an engine reports other fires than the reference."
+
+    def __init__(self, case: FuzzCase, results: dict[str, list]) -> None:
+        self.case = case
+        self.results = results
+        "engine name to its fires"
+        lines = [f"engines disagree on {case}"]
+        lines += [f"  {name}: {fires}" for name, fires in results.items()]
+        super().__init__("\n".join(lines))
+
+
+class VirtualClock:
+    "Replaces time() of the evaluation while it is used as context manager, so timing conditions are reproducible."
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def __enter__(self):
+        self._patched = _engine.time
+        _engine.time = self
+        return self
+
+    def __exit__(self, *exc):
+        _engine.time = self._patched
+
+
+def generate_case(
+    seed: int,
+    names: typing.Sequence[str] = ("a", "b", "c", "ctrl"),
+    events: int = 200,
+    bindings: int = 8,
+    max_lag: float = 0.0,
+    variation: float = 0.0,
+) -> FuzzCase:
+    """Generate random events and bindings.
+
+    Args:
+        seed (int): Same seed, same case.
+        names (typing.Sequence[str], optional): The keys used. Defaults to ("a", "b", "c", "ctrl").
+        events (int, optional): The amount of events. Defaults to 200.
+        bindings (int, optional): The amount of bindings. Defaults to 8.
+        max_lag (float, optional): The highest lag of an event. Keep it 0 when comparing with the offline evaluator, which assumes no lag. Defaults to 0.
+        variation (float, optional): The probability of an event to come from another device, from the keypad, with another name for its scan code or with a scan code of no binding, and of a binding to be limited to a device or to use keypad keys. Keep it 0 when comparing with the offline evaluator, which only knows key names. Defaults to 0.
+
+    Returns:
+        FuzzCase: The case.
+    """
+    rng = random.Random(seed)
+    case_events = []
+    now = 1000.0
+    down = set()
+    for _ in range(events):
+        now += rng.choice(steps)
+        name = rng.choice(names)
+        if name in down:
+            event_type = "up" if rng.random() < 0.6 else "down"  # else a repeat
+        else:
+            event_type = "down" if rng.random() < 0.9 else "up"  # else a release repeat
+        if event_type == "down":
+            down.add(name)
+        else:
+            down.discard(name)
+        lag = rng.choice((0.0, rng.uniform(0, max_lag))) if max_lag else 0.0
+        event_name, scan_code, is_keypad, device = name, name, False, None
+        if variation and rng.random() < variation:
+            kind = rng.choice(("device", "keypad", "alias", "scan_code"))
+            if kind == "device":
+                device = rng.choice(devices)
+            elif kind == "keypad":
+                is_keypad = True
+            elif kind == "alias":  # e.g. "A" for the scan code of "a"
+                event_name = name.upper()
+            else:  # the name of a bound key with a scan code no binding knows
+                scan_code = 250 + names.index(name)
+        case_events.append(
+            (round(now, 6), event_name, event_type, lag, scan_code, is_keypad, device)
+        )
+    case_bindings = {}
+    for i in range(bindings):
+        keys = "+".join(
+            f"{n}[kp]" if variation and rng.random() < variation else n
+            for n in rng.sample(list(names), rng.choice((1, 1, 2, 2, 3)))
+        )
+        _type = rng.choice(("normal", "hold", "multipress"))
+        config = {"type": _type, "keys": keys, "max_delay": rng.choice((0.01, 0.05, 0.2))}
+        if _type == "normal":
+            config["state"] = rng.choice(("down", "down", "up"))
+            config["fire_when_hold"] = rng.random() < 0.3
+        elif _type == "hold":
+            config["time_span"] = rng.choice((0.1, 0.3, 0.5, 1.0))
+            config["continue_fire_when_hold"] = rng.random() < 0.3
+        else:
+            config["presses"] = rng.choice((2, 2, 3))
+            config["time_span"] = rng.choice((0.3, 0.5, 1.0))
+            config["fire_when_hold"] = rng.random() < 0.3
+        if variation and rng.random() < variation * 2:
+            config["device"] = rng.choice(devices)
+        case_bindings[f"{_type}{i}"] = config
+    return FuzzCase(seed, case_events, case_bindings)
+
+
+_bind_functions = {
+    "normal": "bind_hotkey",
+    "hold": "bind_hotkey_hold",
+    "multipress": "bind_hotkey_multipress",
+}
+
+
+def _bind_all(listener: KeyboardListener, bindings: dict, record: typing.Callable):
+    for name, config in bindings.items():
+        config = dict(config)
+        bind = getattr(listener, _bind_functions[config.pop("type", "normal")])
+        bind(config.pop("keys"), record, args=(name,), **config)
+
+
+def _event(event_time: float, name: str, event_type: str, scan_code, is_keypad: bool, device) -> KeyboardEvent:
+    if isinstance(scan_code, str):
+        scan_code = key_to_scan_codes(scan_code)[0]
+    return KeyboardEvent(event_type, scan_code, name, event_time, device, is_keypad=is_keypad)
+
+
+class _ReferenceKey:
+    "A key as the listener tracked it before the bitsets and buckets: a string state, the bindings in a list."
+
+    def __init__(self, name: str, scan_codes: tuple, is_keypad: bool) -> None:
+        self.name = name
+        self.scan_codes = scan_codes
+        self.is_keypad = is_keypad
+        self.state = None
+        self.last_state_change = 0
+        self.last_update = 0
+        self.history: list[tuple[str, float]] = []
+        self.history_length = 0
+        self.bindings: list = []
+        self.device_keys: dict = {}
+
+    def partition(self, device) -> "_ReferenceKey":
+        key = self.device_keys.get(device)
+        if key is None:
+            key = self.device_keys[device] = _ReferenceKey(self.name, self.scan_codes, self.is_keypad)
+        return key
+
+    def update(self, event: KeyboardEvent):
+        self.last_update = event.time
+        if event.event_type != self.state:
+            self.last_state_change = event.time
+            self.state = event.event_type
+            self.history.append((self.state, event.time))
+            while len(self.history) > self.history_length:
+                self.history.pop(0)
+        partition = self.device_keys.get(event.device)
+        if partition is not None:
+            partition.update(event)
+
+
+class _ReferenceBinding:
+    "The conditions of a binding as Binding.check_conditions had them before any optimization."
+
+    def __init__(self, name: str, _type: str, keys: dict, fire_when_hold: bool, max_delay: float) -> None:
+        self.name = name
+        self.type = _type
+        self.keys = keys
+        "key to its state (normal), hold time (hold) or dict of state, time_span and presses (multipress)"
+        self.fire_when_hold = fire_when_hold
+        self.max_delay = max_delay
+        self.did_fire = False
+
+    def check(self, key: _ReferenceKey, now: float) -> bool:
+        if not now - key.last_update < self.max_delay:
+            return False
+        keys = self.keys
+        case2 = self.fire_when_hold or any(
+            round(now, 1) == round(k.last_state_change, 1) for k in keys
+        )
+        fresh = all(now - k.last_update < self.max_delay for k in keys)
+        if self.type == "normal":
+            return all(k.state == state for k, state in keys.items()) and case2 and fresh
+        if self.type == "hold":
+            case1 = all(now - k.last_state_change >= t for k, t in keys.items())
+            case3 = not any(k.last_state_change == 0 for k in keys)
+            if case1 and case3 and fresh:
+                if (not case2 and not self.did_fire) or self.fire_when_hold:
+                    self.did_fire = True
+                    return True
+            elif not case1:
+                self.did_fire = False
+            return False
+        case1 = all(
+            sum(1 for state, t in k.history if state == v["state"] and t >= now - v["time_span"])
+            >= v["presses"]
+            for k, v in keys.items()
+        )
+        case3 = all(k.state == v["state"] for k, v in keys.items())
+        if self.did_fire and case2 and case3:
+            case1 = True
+        self.did_fire = case1 and case2 and case3
+        return case1 and case2 and case3 and fresh
+
+
+_reference_defaults = {
+    "normal": {"state": "down", "fire_when_hold": False, "max_delay": 0.01},
+    "hold": {"time_span": 1, "continue_fire_when_hold": False, "max_delay": 0.01},
+    "multipress": {"state": "down", "time_span": 0.5, "presses": 3, "fire_when_hold": False, "max_delay": 0.01},
+}
+
+
+def reference_engine(case: FuzzCase) -> list[tuple[int, str]]:
+    "The frozen reference, see the module docstring. Only knows the configuration keys generate_case uses."
+    user_keys: dict[tuple[str, bool], _ReferenceKey] = {}
+    for name, config in case.bindings.items():
+        config = dict(config)
+        _type = config.pop("type", "normal")
+        settings = {**_reference_defaults[_type], **config}
+        chord = parse_chord(settings["keys"], (_type,) if _type == "normal" else ("normal", _type))
+        keys = {}
+        for spec in chord.keys:
+            is_keypad = settings.get("is_keypad", False) if spec.is_keypad is None else spec.is_keypad
+            device = settings.get("device") if spec.device is None else spec.device
+            key = user_keys.get((spec.name, is_keypad))
+            if key is None:
+                key = user_keys[(spec.name, is_keypad)] = _ReferenceKey(
+                    spec.name, tuple(key_to_scan_codes(spec.name)), is_keypad
+                )
+            if device is not None:
+                key = key.partition(device)
+            if _type == "normal":
+                keys[key] = settings["state"]
+            elif _type == "hold":
+                keys[key] = settings["time_span"]
+            else:
+                keys[key] = {k: settings[k] for k in ("state", "time_span", "presses")}
+                key.history_length = max(key.history_length, settings["presses"] * 10)
+        binding = _ReferenceBinding(
+            name,
+            _type,
+            keys,
+            settings["continue_fire_when_hold" if _type == "hold" else "fire_when_hold"],
+            settings["max_delay"],
+        )
+        for key in keys:
+            key.bindings.append(binding)
+    fires = []
+    for index, (event_time, name, event_type, lag, scan_code, is_keypad, device) in enumerate(case.events):
+        event = _event(event_time, name, event_type, scan_code, is_keypad, device)
+        now = event_time + lag
+        for key in user_keys.values():  # in the order the keys were created, like the listener
+            if event.is_keypad == key.is_keypad and (event.name == key.name or event.scan_code in key.scan_codes):
+                break
+        else:
+            continue  # keys created from events have no bindings
+        key.update(event)
+        for evaluated in (key, key.device_keys.get(event.device)):
+            if evaluated is not None:
+                fires += [(index, b.name) for b in evaluated.bindings if b.check(evaluated, now)]
+    return sorted(fires)
+
+
+def listener_engine(install: typing.Callable = None, **listener_kwargs) -> typing.Callable:
+    """Make an engine feeding the events to a KeyboardListener.
+
+    Args:
+        install (typing.Callable, optional): Called with the listener, the bindings and the callback to record a fire (taking the binding name) to add the bindings. Defaults to None, which means the bind methods of the listener.
+        **listener_kwargs: Passed to the KeyboardListener, e.g. threaded=True.
+
+    Returns:
+        typing.Callable: The engine, taking a FuzzCase and returning the fires.
+    """
+
+    def engine(case: FuzzCase) -> list[tuple[int, str]]:
+        backend = MemoryBackend()
+        listener = KeyboardListener(
+            registry=KeyRegistry(), backend=backend, **listener_kwargs
+        )
+        fires = []
+        current = [0]
+        record = lambda name: fires.append((current[0], name))
+        (install or _bind_all)(listener, case.bindings, record)
+        handled = threading.Event()
+        if listener.threaded:  # wait for every event, so the clock doesn't run ahead of the processing thread
+            handle = listener._handle_event
+
+            def handle_and_signal(event):
+                try:
+                    handle(event)
+                finally:
+                    handled.set()
+
+            listener._handle_event = handle_and_signal
+        with VirtualClock() as clock:
+            for index, (event_time, name, event_type, lag, *variation) in enumerate(case.events):
+                current[0] = index
+                clock.now = event_time + lag
+                handled.clear()
+                backend.push(_event(event_time, name, event_type, *variation))
+                if listener.threaded:
+                    handled.wait()
+            listener.stop_keyboard_hook()
+        return sorted(fires)
+
+    return engine
+
+
+def _install_artifact(listener: KeyboardListener, bindings: dict, record: typing.Callable):
+    config = {name: {**c, "callback": "record", "args": [name]} for name, c in bindings.items()}
+    compile_bindings(config, layout="fuzz").install({"record": record}, listener.registry)
+
+
+def offline_engine(case: FuzzCase) -> list[tuple[int, str]]:
+    "The evaluator of keyboard_extended.offline, which needs NumPy and assumes events without lag and variation."
+    from .offline import EventLog, evaluate_bindings
+
+    times = [e[0] for e in case.events]
+    index_of = {t: i for i, t in enumerate(times)}
+    log = EventLog(times, [e[1] for e in case.events], [e[2] for e in case.events])
+    results = evaluate_bindings(log, case.bindings)
+    return sorted(
+        (index_of[float(t)], name) for name, result in results.items() for t in result["times"]
+    )
+
+
+def default_engines(max_lag: float = 0.0, variation: float = 0.0) -> dict[str, typing.Callable]:
+    """The engines compared by fuzz by default. The first one is the reference.
+
+    Args:
+        max_lag (float, optional): The offline evaluator is only included without lag. Defaults to 0.
+        variation (float, optional): The offline evaluator is only included without variation. Defaults to 0.
+    """
+    engines = {
+        "reference": reference_engine,
+        "listener": listener_engine(),
+        "threaded": listener_engine(threaded=True),
+        "traced": listener_engine(tracer=Tracer(lambda record: None)),
+        "artifact": listener_engine(install=_install_artifact),
+    }
+    if not max_lag and not variation:
+        with contextlib.suppress(ImportError):
+            import numpy  # noqa: F401
+
+            engines["offline"] = offline_engine
+    return engines
+
+
+def run_case(case: FuzzCase, engines: dict[str, typing.Callable]) -> dict[str, list]:
+    "Run the case through the engines, returns engine name to its fires."
+    return {name: engine(case) for name, engine in engines.items()}
+
+
+def check_case(case: FuzzCase, engines: dict[str, typing.Callable]) -> FuzzMismatch | None:
+    "Run the case through the engines, the first one is the reference. Returns the mismatch if any engine disagrees."
+    results = run_case(case, engines)
+    reference = next(iter(results.values()))
+    if any(fires != reference for fires in results.values()):
+        return FuzzMismatch(case, results)
+    return None
+
+
+def shrink(case: FuzzCase, engines: dict[str, typing.Callable]) -> FuzzCase:
+    "Remove bindings and chunks of events as long as the engines still disagree."
+    bindings = dict(case.bindings)
+    for name in list(bindings):
+        trial = {n: c for n, c in bindings.items() if n != name}
+        if trial and check_case(FuzzCase(case.seed, case.events, trial), engines):
+            bindings = trial
+    events = list(case.events)
+    chunk = len(events) // 2
+    while chunk:
+        start = 0
+        while start < len(events):
+            trial = events[:start] + events[start + chunk :]
+            if trial and check_case(FuzzCase(case.seed, trial, bindings), engines):
+                events = trial
+            else:
+                start += chunk
+        chunk //= 2
+    return FuzzCase(case.seed, events, bindings)
+
+
+def fuzz(
+    engines: dict[str, typing.Callable] = None,
+    iterations: int = 100,
+    seed: int = 0,
+    shrink_mismatches: bool = True,
+    **case_kwargs,
+) -> int:
+    """Compare the engines on generated cases.
+
+    Args:
+        engines (dict[str, typing.Callable], optional): Name to engine, the first one is the reference. An engine takes a FuzzCase and returns its fires as sorted list of (event index, binding name). Defaults to None, which means default_engines.
+        iterations (int, optional): The amount of cases. Defaults to 100.
+        seed (int, optional): The seed of the first case, the following ones count up. Defaults to 0.
+        shrink_mismatches (bool, optional): Shrink a failing case before raising. Defaults to True.
+        **case_kwargs: Passed to generate_case, e.g. max_lag=0.02 or variation=0.15.
+
+    Raises:
+        FuzzMismatch: If an engine disagrees with the reference.
+
+    Returns:
+        int: The amount of fires compared.
+    """
+    if engines is None:
+        engines = default_engines(case_kwargs.get("max_lag", 0.0), case_kwargs.get("variation", 0.0))
+    compared = 0
+    for i in range(iterations):
+        case = generate_case(seed + i, **case_kwargs)
+        results = run_case(case, engines)
+        reference = next(iter(results.values()))
+        if any(fires != reference for fires in results.values()):
+            if shrink_mismatches:
+                raise check_case(shrink(case, engines), engines)
+            raise FuzzMismatch(case, results)
+        compared += len(reference)
+    return compared
+
+
+def main(argv: list[str] = None):
+    "python -m keyboard_extended.fuzzing [--iterations N] [--seed S] [--max-lag SECONDS] [--variation P]"
+    import argparse
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-lag", type=float, default=0.0)
+    parser.add_argument("--variation", type=float, default=0.15)
+    args = parser.parse_args(argv)
+    engines = default_engines(args.max_lag, args.variation)
+    try:
+        compared = fuzz(
+            engines, args.iterations, args.seed, max_lag=args.max_lag, variation=args.variation
+        )
+    except FuzzMismatch as mismatch:
+        print(mismatch)
+        sys.exit(1)
+    print(f"{args.iterations} cases, {compared} fires, engines agree: {', '.join(engines)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Gestures like tap dance ("tap, tap"), tap then hold ("tap, hold") and hold then tap ("hold, tap") on a single key.
+
+The gestures of a key are compiled into a trie whose nodes are the states of a small automaton. Every event advances it in O(1), timeouts are driven by a timer thread, so the history of the key is never scanned. A press shorter than hold_time is a tap, a press reaching hold_time is a hold. When a gesture is a prefix of another one ("tap" and "tap, tap"), the shorter one fires once no further press follows within gap_time.
+"""
+import heapq
+import itertools
+import threading
+import traceback
+import typing
+from time import time
+
+symbols = ("tap", "hold")
+
+
+def parse_gesture(pattern: str | typing.Iterable[str]) -> tuple[str, ...]:
+    """Compile a gesture pattern like "tap, tap, hold" or "tap*2, hold" into a tuple of symbols.
+
+    Args:
+        pattern (str | typing.Iterable[str]): The symbols "tap" and "hold" seperated by ",", "*n" repeats a symbol. May also be an iterable of symbols.
+
+    Returns:
+        tuple[str, ...]: The symbols.
+    """
+    if isinstance(pattern, str):
+        parts = [p.strip() for p in pattern.split(",")]
+    else:
+        parts = list(pattern)
+    result = []
+    for part in parts:
+        symbol, _, repeat = part.partition("*")
+        symbol = symbol.strip()
+        if symbol not in symbols:
+            raise ValueError(f'unknown gesture symbol "{symbol}", expected "tap" or "hold"')
+        result.extend([symbol] * (int(repeat) if repeat else 1))
+    if not result:
+        raise ValueError("empty gesture")
+    return tuple(result)
+
+
+class Gesture:
+    def __init__(
+        self,
+        _id: int,
+        key: str,
+        pattern: tuple[str, ...],
+        callback: typing.Callable,
+        args: typing.Iterable = None,
+    ) -> None:
+        self.id = _id
+        self.key = key
+        self.pattern = pattern
+        self.callback = callback
+        self.args = args
+
+    def __call__(self):
+        if self.args:
+            self.callback(*self.args)
+        else:
+            self.callback()
+
+    def __str__(self) -> str:
+        return f'Gesture object: id: {self.id}, key: "{self.key}", pattern: {", ".join(self.pattern)}'
+
+
+class _Node:
+    "State of the automaton of a key: the symbols seen so far."
+
+    __slots__ = ("children", "gestures")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.gestures: tuple[Gesture, ...] = ()
+        "The gestures completed in this state."
+
+
+class _Automaton:
+    "The compiled gestures of a key and where the key currently is."
+
+    __slots__ = ("root", "node", "phase", "press_time", "generation")
+
+    def __init__(self, root: _Node) -> None:
+        self.root = root
+        self.node = root
+        self.phase = "idle"
+        "idle, down (pressed, not yet a hold), held (hold consumed, waiting for the release) or gap (released, waiting for the next press)"
+        self.press_time = 0.0
+        self.generation = 0
+        "Increased on every transition, invalidates the pending timer."
+
+    def reset(self):
+        self.node = self.root
+        self.phase = "idle"
+        self.generation += 1
+
+
+class GestureEngine:
+    """Detect gestures on single keys. Add it to a listener with `listener.add_observer(engine)`.
+
+    Example:
+        engine = GestureEngine()
+        engine.bind("space", "tap, hold", start_dictation)
+        engine.bind("space", "tap*2", toggle)
+        listener.add_observer(engine)
+
+    Args:
+        hold_time (float, optional): Presses of at least this many seconds are holds, shorter ones taps. Defaults to 0.25.
+        gap_time (float, optional): The maximum time in seconds between a release and the next press of a gesture. Defaults to 0.25.
+    """
+
+    def __init__(self, hold_time: float = 0.25, gap_time: float = 0.25) -> None:
+        self.hold_time = hold_time
+        self.gap_time = gap_time
+        self.gestures: dict[int, Gesture] = {}
+        "id to gesture"
+        self._ids = itertools.count(1)
+        self._automata: dict[str, _Automaton] = {}
+        "key name to its automaton"
+        self._timers: list[tuple[float, int, str, _Automaton, int]] = []
+        "heap of (deadline, sequence number, key name, automaton, its generation)"
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread = None
+
+    def bind(
+        self,
+        key: str,
+        pattern: str | typing.Iterable[str],
+        callback: typing.Callable,
+        args: typing.Iterable = None,
+    ) -> int:
+        """Call callback when the gesture is performed on the key.
+
+        Args:
+            key (str): The name of the key.
+            pattern (str | typing.Iterable[str]): The gesture, e.g. "tap, tap, hold", see parse_gesture.
+            callback (typing.Callable): Called on the thread processing the events or on the timer thread of the engine.
+            args (typing.Iterable, optional): The arguments passed to the callback. Defaults to None.
+
+        Returns:
+            int: The id needed to remove the gesture using unbind.
+        """
+        gesture = Gesture(next(self._ids), key, parse_gesture(pattern), callback, args)
+        with self._condition:
+            self.gestures[gesture.id] = gesture
+            self._compile(key)
+        return gesture.id
+
+    def unbind(self, gesture_id: int):
+        "Remove a gesture added with bind."
+        with self._condition:
+            gesture = self.gestures.pop(gesture_id)
+            self._compile(gesture.key)
+
+    def _compile(self, key: str):
+        root = _Node()
+        for gesture in self.gestures.values():
+            if gesture.key != key:
+                continue
+            node = root
+            for symbol in gesture.pattern:
+                node = node.children.setdefault(symbol, _Node())
+            node.gestures = node.gestures + (gesture,)
+        if root.children:
+            self._automata[key] = _Automaton(root)
+        else:
+            self._automata.pop(key, None)
+
+    def __call__(self, key, event):
+        "Observer for KeyboardListener.add_observer."
+        self.feed(key.name, event.event_type, event.time)
+
+    def feed(self, name: str, event_type: str, event_time: float):
+        """Advance the automaton of the key by an event.
+
+        Args:
+            name (str): The name of the key.
+            event_type (str): "down" or "up".
+            event_time (float): The time of the event in seconds, comparable with time.time().
+        """
+        automaton = self._automata.get(name)
+        if automaton is None:
+            return
+        fired = ()
+        with self._condition:
+            phase = automaton.phase
+            if event_type == "down":
+                if phase in ("idle", "gap"):
+                    automaton.phase = "down"
+                    automaton.press_time = event_time
+                    automaton.generation += 1
+                    self._schedule(name, automaton, event_time + self.hold_time)
+            elif phase == "down":
+                symbol = "tap" if event_time - automaton.press_time < self.hold_time else "hold"
+                fired = self._advance(name, automaton, symbol, event_time)
+            elif phase == "held":
+                if automaton.node is automaton.root:
+                    automaton.reset()
+                else:
+                    automaton.phase = "gap"
+                    automaton.generation += 1
+                    self._schedule(name, automaton, event_time + self.gap_time)
+        self._fire(fired)
+
+    def _advance(self, name: str, automaton: _Automaton, symbol: str, now: float, held: bool = False) -> tuple:
+        "Take a symbol, returns the gestures to fire. held tells whether the key is still down."
+        fired = ()
+        node = automaton.node.children.get(symbol)
+        if node is None:
+            # the gestures completed so far win, the symbol starts over
+            fired = automaton.node.gestures
+            node = automaton.root.children.get(symbol)
+            if node is None:
+                automaton.reset()
+                if held:
+                    automaton.phase = "held"
+                return fired
+        automaton.generation += 1
+        if not node.children:  # nothing can follow, no need to wait
+            fired = fired + node.gestures
+            automaton.node = automaton.root
+            automaton.phase = "held" if held else "idle"
+            return fired
+        automaton.node = node
+        if held:
+            automaton.phase = "held"
+        else:
+            automaton.phase = "gap"
+            self._schedule(name, automaton, now + self.gap_time)
+        return fired
+
+    def _schedule(self, name: str, automaton: _Automaton, deadline: float):
+        heapq.heappush(
+            self._timers,
+            (deadline, next(self._sequence), name, automaton, automaton.generation),
+        )
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run_timers, name="keyboard_extended gestures", daemon=True
+            )
+            self._thread.start()
+        self._condition.notify()
+
+    def _run_timers(self):
+        condition = self._condition
+        while True:
+            with condition:
+                while not self._timers or self._timers[0][0] > time():
+                    condition.wait(self._timers[0][0] - time() if self._timers else None)
+                deadline, _, name, automaton, generation = heapq.heappop(self._timers)
+                if (
+                    automaton.generation != generation
+                    or self._automata.get(name) is not automaton
+                ):
+                    continue
+                fired = self._timeout(name, automaton, deadline)
+            self._fire(fired)
+
+    def _timeout(self, name: str, automaton: _Automaton, now: float) -> tuple:
+        if automaton.phase == "down":  # pressed for hold_time
+            return self._advance(name, automaton, "hold", now, held=True)
+        if automaton.phase == "gap":  # no further press
+            fired = automaton.node.gestures
+            automaton.reset()
+            return fired
+        return ()
+
+    def _fire(self, gestures: tuple):
+        for gesture in gestures:
+            try:
+                gesture()
+            except Exception:
+                traceback.print_exc()
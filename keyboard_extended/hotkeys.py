@@ -0,0 +1,236 @@
+"""Parser for hotkey strings.
+
+Grammar (whitespace around the tokens is ignored):
+
+    hotkey    := chord ("," chord)*
+    chord     := key ("+" key)* [modifier]
+    key       := name qualifier*
+    qualifier := "[" item ("," item)* "]"      item: "kp", "keypad", "dev=<device>" or "device=<device>"
+    modifier  := "*" presses ["@" duration]    multipress, e.g. "ctrl+k*3@0.5s"
+               | "~" duration                  hold, e.g. "ctrl+k~1.5s"
+    duration  := number ["s" | "ms"]
+
+A name may contain spaces ("left ctrl"). Any character is taken literally after a backslash ("\\+", "\\,"). Where a key is expected, a single special character is the name of the key itself, so "+", "ctrl++", "ctrl+," and "ctrl+*" work without escapes. "]" only closes a qualifier and is a literal everywhere else, e.g. "ctrl+]". "*" and "~" only start a modifier when a number follows, otherwise they belong to the name, as in "keypad *" and "ctrl+keypad *", and "@" is only special after the presses, so the names of the keyboard package work as they are.
+"""
+import functools
+import typing
+
+
+class HotkeySyntaxError(ValueError):
+    "Raised for hotkey strings which don't follow the grammar."
+
+    def __init__(self, text: str, position: int, message: str) -> None:
+        super().__init__(f'{message} at position {position} of "{text}"')
+        self.text = text
+        self.position = position
+
+
+class KeySpec(typing.NamedTuple):
+    "A single key of a hotkey string."
+
+    name: str
+    is_keypad: typing.Optional[bool] = None
+    "True if qualified with [kp], None means the is_keypad argument of the bind function."
+    device: typing.Any = None
+    "The device of a [dev=...] qualifier, None means the device argument of the bind function."
+
+
+class ChordSpec(typing.NamedTuple):
+    "Keys which are pressed together, optionally with a hold or multipress modifier."
+
+    keys: tuple[KeySpec, ...]
+    kind: str = "normal"
+    '"normal", "hold" or "multipress"'
+    presses: typing.Optional[int] = None
+    "The presses of a multipress modifier."
+    time_span: typing.Optional[float] = None
+    "The hold time of a hold modifier or the time span of a multipress modifier, in seconds."
+
+    @property
+    def names(self) -> list[str]:
+        return [k.name for k in self.keys]
+
+
+class HotkeySpec(typing.NamedTuple):
+    "The compiled form of a hotkey string: chords that have to follow each other."
+
+    text: str
+    chords: tuple[ChordSpec, ...]
+
+    @property
+    def is_sequence(self) -> bool:
+        return len(self.chords) > 1
+
+
+_specials = "+,[*~"
+'Characters that end a name. "]" only has a meaning inside a qualifier and "@" only after presses, so they are literal elsewhere.'
+_modifiers = "*~"
+"Specials which only end a name when a number follows."
+
+
+class _Parser:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.position = 0
+
+    def error(self, message: str):
+        raise HotkeySyntaxError(self.text, self.position, message)
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self.text[self.position] if self.position < len(self.text) else ""
+
+    def skip_whitespace(self):
+        while self.position < len(self.text) and self.text[self.position].isspace():
+            self.position += 1
+
+    def hotkey(self) -> HotkeySpec:
+        chords = [self.chord()]
+        while self.peek() == ",":
+            self.position += 1
+            chords.append(self.chord())
+        if self.peek():
+            self.error(f'unexpected "{self.peek()}"')
+        return HotkeySpec(self.text, tuple(chords))
+
+    def chord(self) -> ChordSpec:
+        keys = [self.key()]
+        while self.peek() == "+":
+            self.position += 1
+            keys.append(self.key())
+        modifier = self.peek()
+        if modifier == "*":
+            self.position += 1
+            presses = self.number(int)
+            if presses < 1:
+                self.error("presses must be at least 1")
+            time_span = None
+            if self.peek() == "@":
+                self.position += 1
+                time_span = self.duration()
+            return ChordSpec(tuple(keys), "multipress", presses, time_span)
+        if modifier == "~":
+            self.position += 1
+            return ChordSpec(tuple(keys), "hold", None, self.duration())
+        return ChordSpec(tuple(keys))
+
+    def key(self) -> KeySpec:
+        first = self.peek()
+        if not first:
+            self.error("expected a key")
+        if first in _specials:
+            self.position += 1
+            name = first
+        else:
+            name = self.name()
+        is_keypad, device = None, None
+        while self.peek() == "[":
+            self.position += 1
+            for item in self.until("]").split(","):
+                item = item.strip()
+                label, _, value = item.partition("=")
+                if item in ("kp", "keypad"):
+                    is_keypad = True
+                elif label.strip() in ("dev", "device") and value.strip():
+                    device = value.strip()
+                else:
+                    self.error(f'unknown qualifier "{item}"')
+        return KeySpec(name, is_keypad, device)
+
+    def name(self) -> str:
+        text = self.text
+        chars = []
+        literal_end = 0  # escaped characters are kept even if they are whitespace
+        while self.position < len(text):
+            char = text[self.position]
+            if char == "\\":
+                if self.position + 1 == len(text):
+                    self.error("dangling escape")
+                chars.append(text[self.position + 1])
+                literal_end = len(chars)
+                self.position += 2
+            elif char in _specials and (char not in _modifiers or self.number_follows()):
+                break
+            else:
+                chars.append(char)
+                if not char.isspace():
+                    literal_end = len(chars)
+                self.position += 1
+        name = "".join(chars[:literal_end])
+        if not name:
+            self.error("expected a key")
+        return name
+
+    def number_follows(self) -> bool:
+        "Whether a number follows the character at the position, after optional whitespace."
+        rest = self.text[self.position + 1 :].lstrip()
+        return bool(rest) and (rest[0].isdigit() or rest[0] == ".")
+
+    def until(self, end: str) -> str:
+        closing = self.text.find(end, self.position)
+        if closing == -1:
+            self.error(f'missing "{end}"')
+        value = self.text[self.position : closing]
+        self.position = closing + 1
+        return value
+
+    def number(self, kind=float):
+        self.skip_whitespace()
+        start = self.position
+        while self.position < len(self.text) and (
+            self.text[self.position].isdigit()
+            or (kind is float and self.text[self.position] == ".")
+        ):
+            self.position += 1
+        try:
+            return kind(self.text[start : self.position])
+        except ValueError:
+            self.position = start
+            self.error("expected a number")
+
+    def duration(self) -> float:
+        value = self.number()
+        if self.text.startswith("ms", self.position):
+            self.position += 2
+            return value / 1000
+        if self.text.startswith("s", self.position):
+            self.position += 1
+        return value
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_hotkey(text: str) -> HotkeySpec:
+    """Compile a hotkey string, see the module docstring for the syntax. The results are cached, so every distinct string is parsed once.
+
+    Args:
+        text (str): The hotkey string, e.g. "ctrl+shift+a", "ctrl++", "ctrl+]", "keypad *", "ctrl+k*3@0.5s", "a, b, ctrl+c" or "enter[kp]".
+
+    Raises:
+        HotkeySyntaxError: If the string doesn't follow the grammar.
+
+    Returns:
+        HotkeySpec: The immutable spec.
+    """
+    return _Parser(text).hotkey()
+
+
+def parse_chord(text: str, kinds: tuple[str, ...] = ("normal", "hold", "multipress")) -> ChordSpec:
+    """Compile a hotkey string which must consist of a single chord.
+
+    Args:
+        text (str): The hotkey string.
+        kinds (tuple[str, ...], optional): The allowed kinds of the chord. Defaults to all of them.
+
+    Raises:
+        ValueError: If the string is a sequence or the chord has a modifier that is not allowed.
+
+    Returns:
+        ChordSpec: The immutable spec of the chord.
+    """
+    spec = parse_hotkey(text)
+    if spec.is_sequence:
+        raise ValueError(f'"{text}" is a sequence of chords, a single chord is expected')
+    chord = spec.chords[0]
+    if chord.kind not in kinds:
+        raise ValueError(f'"{text}" is a {chord.kind} hotkey, expected {" or ".join(kinds)}')
+    return chord
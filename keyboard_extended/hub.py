@@ -0,0 +1,309 @@
+"""Share one keyboard hook between the processes of a host.
+
+A KeyboardHub owns the hook and publishes the events over a Unix domain socket, the processes subscribe with `KeyboardListener(backend=HubBackend(path))` instead of hooking themselves. Run a hub with `python -m keyboard_extended.hub [path]`.
+
+Wire format: frames of a 4 byte little endian length and a payload. A payload starting with b"S" defines a string (index as unsigned short, then UTF-8), one starting with b"E" is a batch of events (count as unsigned short, then the records). A record is the time as double, the scan code as int, the indices of the name and the device as unsigned shorts (0 means None), the event type (1 down, 0 up) and is_keypad (0 False, 1 True, 2 None) as bytes - 18 bytes per event. Every client receives all strings defined so far when it connects. When all indices are used, the table starts over: the next definition has index 1 again and the client drops the strings after it.
+"""
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+import typing
+
+from keyboard import KeyboardEvent
+
+from .backends import InputBackend, KeyboardHookBackend
+
+default_path = os.path.join(tempfile.gettempdir(), "keyboard_extended.sock")
+
+_length = struct.Struct("<I")
+_string = struct.Struct("<cH")
+_batch = struct.Struct("<cH")
+_record = struct.Struct("<diHHBB")
+_keypad = {False: 0, True: 1, None: 2}
+_keypad_values = (False, True, None)
+
+
+class _TableFull(Exception):
+    "The string table has no free index left."
+
+
+class KeyboardHub:
+    """Publish the events of a backend to the processes connected to a Unix domain socket.
+
+    The hook only appends the event and wakes the sender thread, which sends everything collected meanwhile as one batch. Clients that don't read for send_timeout seconds are dropped, so a stuck process can't stall the others.
+
+    Args:
+        path (str, optional): The socket. Defaults to default_path.
+        backend (InputBackend, optional): The source of the events. Defaults to None, which means the hook of the keyboard package.
+        max_batch (int, optional): The maximum amount of events per batch. Defaults to 512.
+        send_timeout (float, optional): Seconds a client may block the sender. Defaults to 1.
+    """
+
+    max_strings = 0xFFFF
+    "The size of the string table, limited by the unsigned short indices. When it is full it starts over with the strings of the current batch."
+
+    def __init__(
+        self,
+        path: str = default_path,
+        backend: InputBackend = None,
+        max_batch: int = 512,
+        send_timeout: float = 1,
+    ) -> None:
+        self.path = path
+        self.backend = backend if backend is not None else KeyboardHookBackend()
+        self.max_batch = max_batch
+        self.send_timeout = send_timeout
+        self.clients: list[socket.socket] = []
+        self.published = 0
+        "The amount of events sent so far."
+        self._strings: dict[str, int] = {}
+        self._definitions: list[bytes] = []
+        "frames of all strings defined so far, sent to new clients"
+        self._pending: list[KeyboardEvent] = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        "Guards the clients and the string table."
+        self._running = False
+        self._server: socket.socket = None
+        self._threads: list[threading.Thread] = []
+
+    def start(self):
+        "Listen on the socket and start publishing the events of the backend."
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from a hub that didn't stop cleanly
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        self._running = True
+        for target, name in (
+            (self._accept, "keyboard_extended hub accept"),
+            (self._send, "keyboard_extended hub send"),
+        ):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.backend.start(self._publish)
+
+    def stop(self):
+        "Stop the backend, send the events collected so far and disconnect the clients."
+        self.backend.stop()
+        self._running = False
+        self._wakeup.set()
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def serve_forever(self):
+        "Start and block until interrupted."
+        self.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _publish(self, event: KeyboardEvent):
+        self._pending.append(event)
+        self._wakeup.set()
+
+    def _accept(self):
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.settimeout(self.send_timeout)
+            with self._lock:
+                try:
+                    client.sendall(b"".join(self._definitions))
+                except OSError:
+                    client.close()
+                    continue
+                self.clients.append(client)
+
+    def _send(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            running = self._running
+            while self._pending:
+                events = self._pending[: self.max_batch]
+                del self._pending[: len(events)]  # list operations are atomic, the hook may append meanwhile
+                try:
+                    self._broadcast(self._encode(events))
+                except Exception:  # lose the batch, not the sender
+                    traceback.print_exc()
+                    continue
+                self.published += len(events)
+            if not running:
+                return
+
+    def _string_index(self, value, frames: list[bytes]) -> int:
+        if value is None:
+            return 0
+        value = str(value)
+        index = self._strings.get(value)
+        if index is None:
+            if len(self._strings) >= self.max_strings:
+                raise _TableFull
+            index = self._strings[value] = len(self._strings) + 1
+            data = value.encode()
+            frame = _length.pack(_string.size + len(data)) + _string.pack(b"S", index) + data
+            self._definitions.append(frame)
+            frames.append(frame)
+        return index
+
+    def _encode(self, events: list[KeyboardEvent]) -> bytes:
+        with self._lock:
+            try:
+                frames, records = self._encode_records(events)
+            except _TableFull:  # start over, the definitions of this batch replace the table of the clients
+                self._strings.clear()
+                self._definitions.clear()
+                frames, records = self._encode_records(events)
+        payload = _batch.pack(b"E", len(records)) + b"".join(records)
+        frames.append(_length.pack(len(payload)) + payload)
+        return b"".join(frames)
+
+    def _encode_records(self, events: list[KeyboardEvent]) -> tuple[list[bytes], list[bytes]]:
+        "Frames of the new strings and the records of the events, called while holding _lock. Nothing is defined if it fails."
+        frames = []
+        defined = len(self._definitions)
+        try:
+            records = [
+                _record.pack(
+                    event.time,
+                    event.scan_code if isinstance(event.scan_code, int) else 0,
+                    self._string_index(event.name, frames),
+                    self._string_index(event.device, frames),
+                    event.event_type == "down",
+                    _keypad.get(event.is_keypad, 2),
+                )
+                for event in events
+            ]
+        except Exception:  # the clients won't receive the strings of this batch
+            for value in list(self._strings)[defined:]:
+                del self._strings[value]
+            del self._definitions[defined:]
+            raise
+        return frames, records
+
+    def _broadcast(self, data: bytes):
+        with self._lock:
+            clients = list(self.clients)
+        dropped = []
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError:  # gone or too slow
+                dropped.append(client)
+        if dropped:
+            with self._lock:
+                for client in dropped:
+                    client.close()
+                    self.clients.remove(client)
+
+
+class HubBackend(InputBackend):
+    """Receive the events from a KeyboardHub instead of hooking, e.g. `KeyboardListener(backend=HubBackend())`. Events can't be suppressed through a hub.
+
+    Args:
+        path (str, optional): The socket of the hub. Defaults to default_path.
+    """
+
+    def __init__(self, path: str = default_path) -> None:
+        self.path = path
+        self.received = 0
+        "The amount of events received so far."
+        self._socket: socket.socket = None
+        self._thread: threading.Thread = None
+
+    def start(self, callback: typing.Callable, suppress: bool = False):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(self.path)
+        self._thread = threading.Thread(
+            target=self._receive,
+            args=(self._socket, callback),
+            name="keyboard_extended hub client",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._socket is None:
+            return
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._socket = None
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _receive(self, connection: socket.socket, callback: typing.Callable):
+        strings: list = [None]
+        buffer = b""
+        while True:
+            try:
+                data = connection.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data
+            position = 0
+            while len(buffer) - position >= _length.size:
+                (size,) = _length.unpack_from(buffer, position)
+                start = position + _length.size
+                if len(buffer) - start < size:
+                    break
+                position = start + size
+                kind, value = _batch.unpack_from(buffer, start)
+                if kind == b"S":
+                    del strings[value:]
+                    strings.append(buffer[start + _string.size : position].decode())
+                    continue
+                for event_time, scan_code, name, device, down, is_keypad in _record.iter_unpack(
+                    buffer[start + _batch.size : position]
+                ):
+                    callback(
+                        KeyboardEvent(
+                            "down" if down else "up",
+                            scan_code,
+                            strings[name],
+                            event_time,
+                            strings[device],
+                            is_keypad=_keypad_values[is_keypad],
+                        )
+                    )
+                self.received += value
+            buffer = buffer[position:]
+
+
+def main(argv: list[str] = None):
+    "Run a hub: python -m keyboard_extended.hub [path]"
+    argv = sys.argv[1:] if argv is None else argv
+    hub = KeyboardHub(argv[0] if argv else default_path)
+    print(f"keyboard_extended hub listening on {hub.path}")
+    hub.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,593 @@
+import contextlib
+import heapq
+import itertools
+import threading
+import traceback
 import typing
-import uuid
-from time import time
+from collections import deque
+from time import perf_counter, time
+from types import MappingProxyType
 
 from keyboard import *
 
+from .admission import ADMIT, STATE_ONLY, AdmissionControl
+from .backends import InputBackend, KeyboardHookBackend
+from .hotkeys import ChordSpec, parse_chord
+from .snapshot import KeyStateSnapshot
+from .stats import LagStats
+from .suppression import SuppressionState, SuppressionTable
+from .tracing import HookProfiler, TraceRecord, Tracer
+from .watchdog import CallbackWatchdog
 
-event_keys = []
-user_keys = []
-user_to_event_keys = {}
+
+class KeyRegistry:
+    """Everything a KeyboardListener knows about keys and bindings: the keys, the bindings, the indexes to resolve events to keys and the key state bitsets.
+
+    Listeners sharing a registry share their hotkeys. By default all listeners and the functions bind_hotkey, bind_hotkey_hold, bind_hotkey_multipress, remove_binding and remove_all_bindings use `default_registry`. Pass a new KeyRegistry to a KeyboardListener to isolate it.
+
+    Concurrency: the events of a registry are processed by one thread at a time (the hook or the processing thread of its listener), which reads the bindings without taking any lock. Adding and removing bindings may happen from any thread, these writers are serialized by `lock`. A writer never changes what the hook thread iterates: every key publishes its bindings as new tuples with a single reference swap after each change, or once at the end of a `batch` block. The hook thread only takes `lock` itself for the first event of a key it doesn't know: the key is created from the event (Key._from_event), which may start a sweep evicting idle keys, while no writer is changing the indexes. Such an event waits for a writer holding the lock, e.g. a long `batch` block; the events of known keys never wait. Device partitions (Key.get_device_key) are created by the writers binding them, the hook thread only looks them up.
+
+    Keys created from events (e.g. unseen scan codes of other layouts and devices) are evicted once there are more than max_event_keys of them: the least recently used ones without bindings, not held down and idle for key_idle_time are dropped, so memory and lookups stay bounded over long uptimes.
+
+    Args:
+        max_event_keys (int, optional): The amount of keys created from events above which idle keys are evicted. Defaults to 1024.
+        key_idle_time (float, optional): Seconds without any event after which a key without bindings may be evicted. Defaults to 600.
+    """
+
+    def __init__(self, max_event_keys: int = 1024, key_idle_time: float = 600) -> None:
+        self.keys: dict = {}
+        "name to key"
+        self.keys_by_scan_codes: dict = {}
+        self.bindings: dict = {}
+        "id to binding"
+        self.event_keys: list = []
+        "keys created from keyboard events as tuples of name, scan code, is_keypad and key"
+        self.event_key_index: dict = {}
+        "(name, scan code, is_keypad) of the events to the keys in event_keys - changed only while holding lock"
+        self.max_event_keys = max_event_keys
+        self.key_idle_time = key_idle_time
+        self.evictions = 0
+        "The amount of keys evicted so far."
+        self._sweep_at = max_event_keys
+        self._free_indices: list[int] = []
+        "bit positions of evicted keys, reused by new keys so the bitsets stay small"
+        self.user_keys: list = []
+        "keys created by name for bindings as tuples of name, scan codes, is_keypad and key"
+        self.user_key_index: dict = {}
+        "(name, is_keypad) to the key in user_keys - a name may be bound with and without the keypad"
+        self.user_to_event_keys: dict = {}
+        self.pressed_mask: int = 0
+        "Bitset of all keys in the state down."
+        self.released_mask: int = 0
+        "Bitset of all keys in the state up. Keys without a state yet are in neither of the masks."
+        self.adaptive_max_delay: float = None
+        "Set by a KeyboardListener with adaptive_max_delay. Bindings with a smaller max_delay use this one instead."
+        self.watchdog: CallbackWatchdog = None
+        "Set by a KeyboardListener with a watchdog, the callbacks of the bindings are called through it."
+        self._indices = itertools.count()
+        "bit positions never used so far"
+        self.lock = threading.RLock()
+        "Serializes the writers of this registry."
+        self._state_lock = threading.Lock()
+        self.snapshot = KeyStateSnapshot()
+        "Immutable view of the key states, replaced on every state change."
+        self.modifier_bits: int = 0
+        "Bitset of the keys which are modifiers (keyboard.is_modifier)."
+        self._batch_depth = 0
+        self._dirty_keys: set = set()
+        self.suppression = SuppressionTable()
+        "Decision table of the suppressing bindings, replaced as a whole whenever they change."
+        self._suppression_dirty = False
+        self.binding_watchers: tuple[typing.Callable, ...] = ()
+        "Called with the amount of bindings after bindings were added or removed, once at the end of a batch. Replaced as a whole."
+        self._bindings_dirty = False
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Add or remove many bindings at once: the changed bindings of the keys are published once at the end of the block instead of after every single change. Other writers wait until the block is left.
+
+        Example:
+            with registry.batch():
+                for hotkey_id in hotkey_ids:
+                    remove_binding(hotkey_id, registry)
+        """
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    dirty, self._dirty_keys = self._dirty_keys, set()
+                    for key in dirty:
+                        key._publish_bindings()
+                    if self._suppression_dirty:
+                        self._publish_suppression()
+                    if self._bindings_dirty:
+                        self._bindings_changed()
+
+    def _register_bit(self, key: "Key"):
+        "Make a key known to the snapshots, called by the keys registered by name. Keys sharing name and is_keypad share the entry, see KeyStateSnapshot."
+        with self._state_lock:
+            if is_modifier(key.name):
+                self.modifier_bits |= key.bit
+            snapshot = self.snapshot
+            bits = dict(snapshot.bits)
+            entry = (key.name, bool(key.is_keypad))
+            bits[entry] = bits.get(entry, 0) | key.bit
+            self.snapshot = KeyStateSnapshot(
+                snapshot.pressed_mask,
+                snapshot.released_mask,
+                snapshot.modifier_mask,
+                snapshot.last_changes,
+                MappingProxyType(bits),
+                snapshot.time,
+            )
+
+    def _take_index(self) -> int:
+        with self._state_lock:
+            if self._free_indices:
+                return heapq.heappop(self._free_indices)
+            return next(self._indices)
+
+    def _add_event_key(self, key: "Key"):
+        "Register a key created from an event, called while holding lock."
+        self.event_keys.append((key.name, key.scan_code, key.is_keypad, key))
+        self.event_key_index[(key.name, key.scan_code, key.is_keypad)] = key
+        if len(self.event_keys) >= self._sweep_at:
+            self._evict_event_keys(time())
+
+    def _evict_event_keys(self, now: float):
+        """Evict the least recently used idle keys without bindings until max_event_keys is undercut by a tenth, called while holding lock.
+
+        If too few keys can be evicted the next sweep happens after another tenth of max_event_keys new keys, so the sweeps stay amortized O(log n) per new key.
+        """
+        target = self.max_event_keys - self.max_event_keys // 10
+        excess = len(self.event_keys) - target
+        candidates = [
+            key
+            for (_, _, _, key) in self.event_keys
+            if key._is_evictable(now, self.key_idle_time)
+        ]
+        candidates.sort(key=lambda k: k.last_update)
+        evicted = set(candidates[:excess])
+        if evicted:
+            self.event_keys[:] = [e for e in self.event_keys if e[3] not in evicted]
+            for (name, scan_code, is_keypad), key in list(self.event_key_index.items()):
+                if key in evicted:
+                    del self.event_key_index[(name, scan_code, is_keypad)]
+            for key in evicted:
+                if self.keys.get(key.name) is key:
+                    del self.keys[key.name]
+                for k in (key, *key.device_keys.values()):
+                    self._release_index(k)
+            self.evictions += len(evicted)
+        self._sweep_at = max(
+            self.max_event_keys, len(self.event_keys) + max(1, self.max_event_keys // 10)
+        )
+
+    def _release_index(self, key: "Key"):
+        "Clear the bits of an evicted key and make its bit position reusable."
+        with self._state_lock:
+            self.pressed_mask &= ~key.bit
+            self.released_mask &= ~key.bit
+            self.modifier_bits &= ~key.bit
+            snapshot = self.snapshot
+            entry = (key.name, bool(key.is_keypad))
+            if snapshot.bits.get(entry, 0) & key.bit:
+                bits = dict(snapshot.bits)
+                bits[entry] &= ~key.bit
+                if not bits[entry]:
+                    del bits[entry]
+                self.snapshot = KeyStateSnapshot(
+                    self.pressed_mask,
+                    self.released_mask,
+                    self.pressed_mask & self.modifier_bits,
+                    snapshot.last_changes.without(key.index),
+                    MappingProxyType(bits),
+                    snapshot.time,
+                )
+            heapq.heappush(self._free_indices, key.index)
+
+    def _publish_state(self, key: "Key"):
+        "Publish a new snapshot after the state of the key changed, called with _state_lock held. O(1) amortized, see LastChanges."
+        snapshot = self.snapshot
+        self.snapshot = KeyStateSnapshot(
+            self.pressed_mask,
+            self.released_mask,
+            self.pressed_mask & self.modifier_bits,
+            snapshot.last_changes.changed(key.index, key.last_state_change),
+            snapshot.bits,
+            key.last_state_change,
+        )
+
+    def _publish(self, key: "Key"):
+        if self._batch_depth:
+            self._dirty_keys.add(key)
+        else:
+            key._publish_bindings()
+
+    def _publish_suppression(self):
+        "Rebuild the decision table of the suppressing bindings, deferred to the end of a batch."
+        if self._batch_depth:
+            self._suppression_dirty = True
+            return
+        self._suppression_dirty = False
+        self.suppression = SuppressionTable(
+            b for b in self.bindings.values() if b.suppress
+        )
+
+    def _bindings_changed(self):
+        "Tell the binding_watchers the new amount of bindings, deferred to the end of a batch."
+        if self._batch_depth:
+            self._bindings_dirty = True
+            return
+        self._bindings_dirty = False
+        count = len(self.bindings)
+        for watcher in self.binding_watchers:
+            watcher(count)
+
+    def _resync_states(self, is_pressed: typing.Callable[[int], bool]):
+        """Correct the key states after events were missed, e.g. while the hook of a listener was removed. Nothing fires, the fire latches of the bindings are reset.
+
+        Args:
+            is_pressed (typing.Callable[[int], bool]): Tells whether the key with the scan code is down right now.
+        """
+        now = time()
+        with self.lock:
+            keys = {
+                *self.keys.values(),
+                *(e[3] for e in self.event_keys),
+                *(e[3] for e in self.user_keys),
+            }
+            for key in keys:
+                scan_codes = key.scan_code if isinstance(key.scan_code, (tuple, list)) else (key.scan_code,)
+                down = any(is_pressed(s) for s in scan_codes)
+                key._resync_state(down, now)
+            for binding in self.bindings.values():
+                binding.did_fire = False
+
+
+default_registry = KeyRegistry()
+event_keys = default_registry.event_keys
+user_keys = default_registry.user_keys
+user_to_event_keys = default_registry.user_to_event_keys
 
 
 class KeyboardListener:
-    "Start listening to keyboard events. This is necessary to add hotkeys of this package since they rely on a hook to the keyboard."
+    """Start listening to keyboard events. This is necessary to add hotkeys of this package since they rely on a hook to the keyboard.
 
-    def __init__(self, start_listening: bool = True):
+    Args:
+        start_listening (bool, optional): Hook to the keyboard right away. Defaults to True.
+        tracer (Tracer, optional): Receives a TraceRecord for the sampled events, telling which bindings were evaluated and why they did not fire. Defaults to None.
+        profiler (optional): A profiler (e.g. cProfile.Profile or pyinstrument.Profiler) which is only enabled while the hook processes an event. Defaults to None.
+        adaptive_max_delay (bool, optional): Let the max_delay of all bindings follow the 99th percentile (with some headroom) of the measured lag between the keyboard events and the hook, so hotkeys keep working when the machine is busy. The max_delay of a binding is never lowered. Defaults to False.
+        adaptive_max_delay_bounds (tuple[float, float], optional): The lowest and highest value the adaptive max_delay may take. Defaults to (0.01, 0.1).
+        threaded (bool, optional): The hook only queues the events and returns right away, a dedicated thread resolves the keys and calls the bindings in the order of the events. Defaults to False.
+        registry (KeyRegistry, optional): The keys and bindings of this listener. Use the bind methods of the listener to add hotkeys to it. Defaults to None, which means the default registry used by the bind_hotkey functions.
+        backend (InputBackend, optional): The source of the events, e.g. a MemoryBackend to push events without a keyboard. Defaults to None, which means the hook of the keyboard package.
+        suppress (bool, optional): Block the events of hotkeys added with suppress=True from reaching other applications. The hook decides with the precomputed decision table of the registry and the events are handled afterwards like with threaded=True, so no callback runs inside the hook. Defaults to False.
+        admission (AdmissionControl, optional): Drops stale, injected and shed events before they are resolved, so bursts of synthetic events don't starve real hotkeys. Defaults to None.
+        watchdog (CallbackWatchdog, optional): Measures the runtime of the callbacks of the bindings of the registry, flags those over its budget and optionally moves them to a worker thread. Defaults to None.
+        unhook_when_idle (bool, optional): Remove the hook while the registry has no bindings and the listener has no observers, and hook again as soon as a binding or observer is added. The key states are then corrected with the keys the backend reports as down (all keys up if it can't tell), since events were missed meanwhile. The hook follows the changes of the bindings on a helper thread, see wait_hook_update. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        start_listening: bool = True,
+        tracer: Tracer = None,
+        profiler=None,
+        adaptive_max_delay: bool = False,
+        adaptive_max_delay_bounds: tuple[float, float] = (0.01, 0.1),
+        threaded: bool = False,
+        registry: KeyRegistry = None,
+        suppress: bool = False,
+        backend: InputBackend = None,
+        unhook_when_idle: bool = False,
+        watchdog: CallbackWatchdog = None,
+        admission: AdmissionControl = None,
+    ):
         self.hook = None
+        "The callback given to the backend while hooked."
+        self.listening = False
+        "Whether listening was started, the hook may still be removed while idle."
+        self.backend = backend if backend is not None else KeyboardHookBackend()
+        self.registry = registry if registry is not None else default_registry
+        self.suppress = suppress
+        self.suppression_state = SuppressionState()
+        "The keys the suppressing hook has seen down."
+        self.threaded = threaded or suppress
+        self._queue: deque = deque()
+        self._wakeup = threading.Event()
+        self._processing_thread: threading.Thread = None
+        self.tracer = tracer
+        self.lag_stats = LagStats()
+        "Statistics of the lag between the keyboard events and their arrival at the hook."
+        self.adaptive_max_delay = adaptive_max_delay
+        self.adaptive_max_delay_bounds = adaptive_max_delay_bounds
+        self.adaptive_max_delay_headroom = 1.5
+        "Factor applied to the 99th percentile of the lag, since the bindings are checked a little after the lag was measured."
+        if profiler is not None and not isinstance(profiler, HookProfiler):
+            profiler = HookProfiler(profiler)
+        self.profiler = profiler
+        self.watchdog = watchdog
+        if watchdog is not None:
+            self.registry.watchdog = watchdog
+        self.admission = admission
+        if admission is not None:
+            admission.attach(self.registry)
+        self.observers: tuple[typing.Callable, ...] = ()
+        "Called with the key and the event after the state of the key was updated, before the bindings are checked. Replaced as a whole by add_observer and remove_observer."
+        self.unhook_when_idle = unhook_when_idle
+        self._hook_lock = threading.Lock()
+        "Serializes installing and removing the hook."
+        self._hook_update_lock = threading.Lock()
+        self._hook_update_pending = False
+        self._hook_updater: threading.Thread = None
+        if unhook_when_idle:
+            with self.registry.lock:
+                self.registry.binding_watchers += (self._update_hook,)
         if start_listening:
             self.start_keyboard_hook()
 
     def start_keyboard_hook(self):
-        self.hook = hook(self._keyboard_hook)
+        with self._hook_lock:
+            self.listening = True
+            if not self.unhook_when_idle or not self._is_idle():
+                self._install_hook()
 
     def stop_keyboard_hook(self):
+        with self._hook_lock:
+            self.listening = False
+            self._remove_hook()
+        if self._processing_thread is not None:
+            self._stop_processing_thread()
+
+    def _install_hook(self):
+        if self.hook:
+            return
+        if self.threaded and self._processing_thread is None:
+            self._start_processing_thread()
+        if self.suppress:
+            self.suppression_state = SuppressionState()
+            self.hook = self._suppressing_hook
+        elif self.threaded:
+            self.hook = self._enqueue_event
+        else:
+            self.hook = self._keyboard_hook
+        self.backend.start(self.hook, suppress=self.suppress)
+
+    def _remove_hook(self):
+        "Remove the hook, a processing thread is kept to be reused."
         if self.hook:
-            self.hook = unhook(self.hook)
+            self.backend.stop()
+            self.hook = None
+
+    def _is_idle(self) -> bool:
+        return not self.registry.bindings and not self.observers
+
+    def _update_hook(self, *_):
+        """Schedule _reconcile_hook on a helper thread, see unhook_when_idle. A binding watcher of the registry.
+
+        The watchers are called by the writers while they hold the lock of the registry. Stopping a backend joins its delivery thread, which may wait for that lock to create a key, so the hook is never changed here.
+        """
+        with self._hook_update_lock:
+            self._hook_update_pending = True
+            if self._hook_updater is None:
+                self._hook_updater = threading.Thread(
+                    target=self._apply_hook_updates,
+                    name="keyboard_extended hook update",
+                    daemon=True,
+                )
+                self._hook_updater.start()
+
+    def _apply_hook_updates(self):
+        while True:
+            with self._hook_update_lock:
+                if not self._hook_update_pending:
+                    self._hook_updater = None
+                    return
+                self._hook_update_pending = False
+            try:
+                self._reconcile_hook()
+            except Exception:
+                traceback.print_exc()
+
+    def _reconcile_hook(self):
+        "Remove the hook if the listener is idle or restore it if not. The backend is started and stopped without holding the lock of the registry."
+        with self._hook_lock:
+            with self.registry.lock:
+                if not self.listening:
+                    return
+                idle = self._is_idle()
+                if not idle and not self.hook:
+                    self.registry._resync_states(self.backend.is_pressed)
+            if idle:
+                self._remove_hook()
+            else:
+                self._install_hook()
+
+    def wait_hook_update(self, timeout: float = None):
+        "Wait until the hook follows the latest binding changes, see unhook_when_idle."
+        with self._hook_update_lock:
+            updater = self._hook_updater
+        if updater is not None and updater is not threading.current_thread():
+            updater.join(timeout)
+
+    def close(self):
+        "Stop listening and stop watching the bindings of the registry."
+        with self.registry.lock:
+            self.registry.binding_watchers = tuple(
+                w for w in self.registry.binding_watchers if w != self._update_hook
+            )
+        self.wait_hook_update()
+        self.stop_keyboard_hook()
+
+    def _start_processing_thread(self):
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._processing_thread = threading.Thread(
+            target=self._process_queue,
+            args=(self._queue, self._wakeup),
+            name="keyboard_extended event processing",
+            daemon=True,
+        )
+        self._processing_thread.start()
+
+    def _stop_processing_thread(self):
+        "Let the processing thread handle the events queued so far and end it."
+        thread = self._processing_thread
+        self._processing_thread = None
+        self._wakeup.set()
+        if thread is not threading.current_thread():
+            thread.join()
+
+    def _enqueue_event(self, event: KeyboardEvent):
+        self._queue.append((event, time()))
+        self._wakeup.set()
+
+    def _suppressing_hook(self, event: KeyboardEvent):
+        suppressed = self.registry.suppression.decide(event, self.suppression_state)
+        self._queue.append((event, time()))
+        self._wakeup.set()
+        return not suppressed
+
+    def _process_queue(self, queue: deque, wakeup: threading.Event):
+        while True:
+            wakeup.wait()
+            wakeup.clear()
+            while queue:
+                event, received = queue.popleft()
+                self._measure_lag(received - event.time)
+                try:
+                    admission = self.admission
+                    if admission is not None:
+                        action = admission.admit(
+                            event, time() - event.time, len(queue), self._get_user_key_from_event
+                        )
+                        if action is not ADMIT:
+                            if action is STATE_ONLY:
+                                self._get_user_key_from_event(event).update(event)
+                            continue
+                    self._handle_event(event)
+                except Exception:
+                    traceback.print_exc()
+            if self._processing_thread is not threading.current_thread():
+                return
+
+    def add_observer(self, observer: typing.Callable):
+        """Call observer(key, event) for every event after the key state was updated, e.g. a TypingMetrics. It runs on the thread processing the events, so it should be fast.
+
+        Args:
+            observer (typing.Callable): Receives the updated Key and the KeyboardEvent.
+        """
+        self.observers = self.observers + (observer,)
+        if self.unhook_when_idle:
+            self._reconcile_hook()
+
+    def remove_observer(self, observer: typing.Callable):
+        "Stop calling an observer added with add_observer."
+        self.observers = tuple(o for o in self.observers if o is not observer)
+        if self.unhook_when_idle:
+            self._reconcile_hook()
+
+    def snapshot(self) -> KeyStateSnapshot:
+        """Get an immutable view of the key states, e.g. to check from a worker thread whether ctrl is down and for how long shift has been held. It is published by the thread processing the events, reading it takes no lock.
+
+        Returns:
+            KeyStateSnapshot: The latest snapshot of the registry of this listener.
+        """
+        return self.registry.snapshot
+
+    @property
+    def pressed_mask(self) -> int:
+        "Bitset of all keys currently down, bit `key.index` belongs to `key`."
+        return self.registry.pressed_mask
+
+    def bind_hotkey(self, keys: str, callback: typing.Callable, *args, **kwargs):
+        "Same as the function bind_hotkey, but the hotkey is added to the registry of this listener."
+        return bind_hotkey(keys, callback, *args, registry=self.registry, **kwargs)
+
+    def bind_hotkey_hold(self, keys: str, callback: typing.Callable, *args, **kwargs):
+        "Same as the function bind_hotkey_hold, but the hotkey is added to the registry of this listener."
+        return bind_hotkey_hold(keys, callback, *args, registry=self.registry, **kwargs)
+
+    def bind_hotkey_multipress(
+        self, keys: str, callback: typing.Callable, *args, **kwargs
+    ):
+        "Same as the function bind_hotkey_multipress, but the hotkey is added to the registry of this listener."
+        return bind_hotkey_multipress(
+            keys, callback, *args, registry=self.registry, **kwargs
+        )
+
+    def remove_binding(self, hotkey_id: int):
+        "Same as the function remove_binding for the registry of this listener."
+        return remove_binding(hotkey_id, registry=self.registry)
+
+    def remove_all_bindings(self):
+        "Same as the function remove_all_bindings for the registry of this listener."
+        return remove_all_bindings(registry=self.registry)
 
     def _keyboard_hook(self, event: KeyboardEvent):
+        lag = time() - event.time
+        self._measure_lag(lag)
+        admission = self.admission
+        if admission is not None:
+            action = admission.admit(event, lag)
+            if action is not ADMIT:
+                if action is STATE_ONLY:
+                    self._get_user_key_from_event(event).update(event)
+                return
+        self._handle_event(event)
+
+    def _handle_event(self, event: KeyboardEvent):
+        if self.profiler is not None:
+            with self.profiler:
+                self._process_event(event)
+        else:
+            self._process_event(event)
+
+    def _measure_lag(self, lag: float):
+        self.lag_stats.add(lag)
+        if self.adaptive_max_delay:
+            lower, upper = self.adaptive_max_delay_bounds
+            adaptive = self.lag_stats.p99 * self.adaptive_max_delay_headroom
+            self.registry.adaptive_max_delay = min(max(adaptive, lower), upper)
+
+    def _process_event(self, event: KeyboardEvent):
+        tracer = self.tracer
+        if tracer is not None and tracer.should_sample():
+            return self._process_event_traced(event, tracer)
         key = self._get_user_key_from_event(event)
         key.update(event)
+        for observer in self.observers:
+            observer(key, event)
         key.check_for_callbacks()
 
+    def _process_event_traced(self, event: KeyboardEvent, tracer: Tracer):
+        start = perf_counter()
+        key = self._get_user_key_from_event(event)
+        key.update(event)
+        for observer in self.observers:
+            observer(key, event)
+        resolved = perf_counter()
+        records = []
+        key.trace_callbacks(records)
+        end = perf_counter()
+        tracer.observer(TraceRecord(event, key, records, resolved - start, end - resolved))
+
     def _get_user_key_from_event(self, event: KeyboardEvent):
+        registry = self.registry
+
         def get_key_from_event(event: KeyboardEvent):
-            reduced = [(n, s, kp) for (n, s, kp, k) in event_keys]
-            keys = [k for (n, s, kp, k) in event_keys]
-            try:
-                index = reduced.index((event.name, event.scan_code, event.is_keypad))
-                key = keys[index]
-            except:
-                key = Key._from_event(event)
+            key = registry.event_key_index.get(
+                (event.name, event.scan_code, event.is_keypad)
+            )
+            if key is None:
+                key = Key._from_event(event, registry)
             return key
 
-        for entry in user_keys:
+        for entry in registry.user_keys:
             name, scan_codes, is_keypad, key = entry
             key: Key
             if event.is_keypad == is_keypad:
@@ -53,9 +599,13 @@ class KeyboardListener:
 
 
 class Key:
-    keys: dict = {}
-    keys_by_scan_codes: dict = {}
-    _general_bindings = {}
+    keys: dict = default_registry.keys
+    keys_by_scan_codes: dict = default_registry.keys_by_scan_codes
+    _general_bindings = default_registry.bindings
+    _binding_ids = itertools.count(1)
+    "Handles of the bindings, small increasing integers which are never reused."
+    transitions = ("press", "repeat", "release", "release_repeat")
+    "Kinds of events: press (up -> down), repeat (down -> down), release (down -> up) and release_repeat (up -> up)."
 
     def __init__(
         self,
@@ -66,24 +616,57 @@ class Key:
         _time=0,
         device=None,
         is_keypad=None,
+        _register: bool = True,
+        registry: KeyRegistry = None,
     ) -> None:
+        self.registry = registry if registry is not None else default_registry
         self.name = name
         self.scan_code = scan_code
+        self.device = device
+        self.is_keypad = is_keypad
         self.last_scan_code = scan_code
-        self.state = event_type
+        self.index = self.registry._take_index()
+        "Dense id of this key within its registry, used as bit position in the key state bitsets."
+        self.bit = 1 << self.index
+        self.state = None
         self.modifiers = modifiers
         self.last_state_change = _time
         self.last_update = _time
-        self.device = device
-        self.is_keypad = is_keypad
+        self.registered = _register
+        "Whether the key is registered by name in its registry and part of its snapshots - device partitions are not."
+        if _register:
+            self.registry._register_bit(self)
+        if event_type is not None:
+            self._set_state(event_type)
         self.history = []
         self.history_length = 0
         self.history_length_factor = 10
         "When using multipress binding there must be a history. The length of this is calculated by the highest amound of needed presses for multiplied with this factor. When not using any multipress binding the history length is 0."
-        self.bindings: dict[uuid.UUID, Binding] = {}
+        self._presses_counts: dict[int, int] = {}
+        "needed presses to the amount of multipress bindings of this key needing them"
+        self._presses_heap: list[int] = []
+        "negated needed presses as max heap, may contain presses no longer in _presses_counts"
+        self.bindings: dict[int, Binding] = {}
         "id to binding"
+        self.transition = None
+        "The kind of the last event, one of Key.transitions."
+        self._bucket_sources: dict[str, dict[int, Binding]] = {
+            t: {} for t in Key.transitions
+        }
+        "transition to the bindings which may fire on it - only changed by writers holding the registry lock"
+        self._reset_sources: dict[str, dict[int, Binding]] = {
+            t: {} for t in Key.transitions
+        }
+        "transition to the bindings which can't fire on it but need their fire latch to be reset - only changed by writers holding the registry lock"
+        self._buckets: dict[str, tuple[Binding]] = {t: () for t in Key.transitions}
+        "published, immutable version of _bucket_sources read by the hook thread"
+        self._resets: dict[str, tuple[Binding]] = {t: () for t in Key.transitions}
+        "published, immutable version of _reset_sources read by the hook thread"
+        self.device_keys: dict[typing.Any, Key] = {}
+        "device to the partition of this key that only holds the state caused by events of that device. Partitions only exist for devices targeted by a binding."
 
-        Key.keys[name] = self
+        if _register:
+            self.registry.keys[name] = self
 
     def __str__(self) -> str:
         return f'Key object: name: "{self.name}", state: "{self.state}", scan_code: {self.scan_code}, last_state_change: {self.last_state_change}, last_update: {self.last_update}, len(bindings): {len(self.bindings)}, is_keypad: {self.is_keypad}, device: {self.device}'
@@ -112,8 +695,9 @@ class Key:
         self.modifiers = event.modifiers
         self.last_update = event.time
         if event.event_type != self.state:
+            self.transition = "press" if event.event_type == "down" else "release"
             self.last_state_change = event.time
-            self.state = event.event_type
+            self._set_state(event.event_type)
             self.history.append(
                 {
                     "state": self.state,
@@ -123,37 +707,191 @@ class Key:
             )
             while len(self.history) > self.history_length:
                 self.history.pop(0)
+        else:
+            self.transition = (
+                "repeat" if event.event_type == "down" else "release_repeat"
+            )
+        partition = self.device_keys.get(event.device)
+        if partition is not None:
+            partition.update(event)
+
+    def _set_state(self, state):
+        "Set the state and keep the key state bitsets in sync."
+        self.state = state
+        registry = self.registry
+        with registry._state_lock:  # keys created by writers copy their state, too
+            if state == "down":
+                registry.pressed_mask |= self.bit
+                registry.released_mask &= ~self.bit
+            elif state == "up":
+                registry.released_mask |= self.bit
+                registry.pressed_mask &= ~self.bit
+            else:
+                registry.pressed_mask &= ~self.bit
+                registry.released_mask &= ~self.bit
+            if self.registered:
+                registry._publish_state(self)
+
+    def _resync_state(self, down: bool, now: float):
+        "Set the state without an event, see KeyRegistry._resync_states. Keys without any state yet stay so unless they are down."
+        state = "down" if down else "up"
+        if self.state != state and (down or self.state is not None):
+            self.last_state_change = now
+            self._set_state(state)
+        for partition in self.device_keys.values():
+            if partition.state == "down" and not down:  # the device of a held key is unknown
+                partition.last_state_change = now
+                partition._set_state("up")
 
     def check_for_callbacks(self):
-        try:
-            for binding in self.bindings.values():
-                binding(self)
-        except RuntimeError:
-            return "self.bindings dictionary keys changed during iteration"
+        for binding in self._resets[self.transition]:
+            binding.reset(self)
+        for binding in self._buckets[self.transition]:
+            binding(self)
+        partition = self.device_keys.get(self.device)
+        if partition is not None:
+            return partition.check_for_callbacks()
+
+    def trace_callbacks(self, records: list):
+        """Same as check_for_callbacks, but every evaluated binding is added to records as tuple of its id, whether it fired and the condition that failed.
+
+        Args:
+            records (list): The list the evaluated bindings are appended to.
+        """
+        for binding in self._resets[self.transition]:
+            binding.reset(self)
+        for binding in self._buckets[self.transition]:
+            fired = binding(self)
+            records.append((binding.id, fired, binding.failed_condition))
+        partition = self.device_keys.get(self.device)
+        if partition is not None:
+            partition.trace_callbacks(records)
+
+    def add_binding(self, binding: "Binding"):
+        "Register the binding on this key and sort it into the buckets of the transitions it is evaluated on."
+        with self.registry.lock:
+            self.bindings[binding.id] = binding
+            evaluate, reset = binding.get_transitions(self)
+            for transition in evaluate:
+                self._bucket_sources[transition][binding.id] = binding
+            for transition in reset:
+                self._reset_sources[transition][binding.id] = binding
+            if binding.type == "multipress":
+                presses = binding.keys_to_multipress_times[self]["presses"]
+                count = self._presses_counts.get(presses, 0)
+                self._presses_counts[presses] = count + 1
+                if count == 0:
+                    heapq.heappush(self._presses_heap, -presses)
+                self._update_history_length()
+            self.registry._publish(self)
+
+    def remove_binding(self, binding_id):
+        "Remove the binding with the given id from this key."
+        with self.registry.lock:
+            binding = self.bindings.pop(binding_id)
+            for bucket in self._bucket_sources.values():
+                bucket.pop(binding_id, None)
+            for bucket in self._reset_sources.values():
+                bucket.pop(binding_id, None)
+            if binding.type == "multipress":
+                presses = binding.keys_to_multipress_times[self]["presses"]
+                count = self._presses_counts[presses] - 1
+                if count:
+                    self._presses_counts[presses] = count
+                else:
+                    del self._presses_counts[presses]
+                self._update_history_length()
+            self.registry._publish(self)
+
+    def clear_bindings(self):
+        "Remove all bindings from this key at once."
+        with self.registry.lock:
+            self.bindings = {}
+            self._bucket_sources = {t: {} for t in Key.transitions}
+            self._reset_sources = {t: {} for t in Key.transitions}
+            self._presses_counts = {}
+            self._presses_heap = []
+            self.history_length = 0
+            self.registry._publish(self)
+
+    def _publish_bindings(self):
+        "Replace the bindings read by the hook thread with a snapshot of the current ones."
+        self._resets = {t: tuple(b.values()) for t, b in self._reset_sources.items()}
+        self._buckets = {t: tuple(b.values()) for t, b in self._bucket_sources.items()}
+
+    def get_device_key(self, device):
+        """Get the partition of this key for the given device. It only holds the state and history caused by events of this device and is created if it doesn't exist yet.
+
+        Args:
+            device: The device as given by the keyboard events (event.device).
+
+        Returns:
+            Key: The partition of this key for the device.
+        """
+        key = self.device_keys.get(device)
+        if key is not None:
+            return key
+        with self.registry.lock:
+            key = self.device_keys.get(device)
+            if key is not None:
+                return key
+            key = Key(
+                self.name,
+                self.scan_code,
+                device=device,
+                is_keypad=self.is_keypad,
+                _register=False,
+                registry=self.registry,
+            )
+            self.device_keys[device] = key
+        return key
 
     @classmethod
-    def _from_event(cls, event: KeyboardEvent):
-        self = cls(
-            event.name,
-            event.scan_code,
-            event.event_type,
-            event.modifiers,
-            event.time,
-            event.device,
-            event.is_keypad,
-        )
-        event_keys.append((self.name, self.scan_code, self.is_keypad, self))
+    def _from_event(cls, event: KeyboardEvent, registry: KeyRegistry = None):
+        if registry is None:
+            registry = default_registry
+        with registry.lock:
+            self = cls(
+                event.name,
+                event.scan_code,
+                event.event_type,
+                event.modifiers,
+                event.time,
+                event.device,
+                event.is_keypad,
+                registry=registry,
+            )
+            registry._add_event_key(self)
         return self
 
+    def _is_evictable(self, now: float, idle_time: float) -> bool:
+        "Whether the key and its device partitions have no bindings, aren't held down and had no event for idle_time."
+        return (
+            not self.bindings
+            and self.state != "down"
+            and now - self.last_update >= idle_time
+            and not any(p.bindings for p in self.device_keys.values())
+        )
+
     @classmethod
-    def _from_name(cls, name: str, is_keypad: bool = False):
+    def _from_name(
+        cls,
+        name: str,
+        is_keypad: bool = False,
+        registry: KeyRegistry = None,
+        scan_codes: tuple = None,
+    ):
+        "Create a key by name. scan_codes skips resolving them, e.g. when they were cached by a BindingArtifact."
         name = name
-        scan_codes = key_to_scan_codes(name)
+        if scan_codes is None:
+            scan_codes = key_to_scan_codes(name)
         self = cls(
             name,
             scan_codes,
             is_keypad=is_keypad,
+            registry=registry,
         )
+        event_keys = self.registry.event_keys
 
         def find_key_in_event_keys(scan_codes, is_keypad) -> Key | None:
             reduced = [(s, kp) for (n, s, kp, k) in event_keys]
@@ -173,51 +911,74 @@ class Key:
 
         if evnt:
             self.last_scan_code = evnt.last_scan_code
-            self.state = evnt.state
             self.modifiers = evnt.modifiers
             self.last_state_change = evnt.last_state_change
             self.last_update = evnt.last_update
+            self._set_state(evnt.state)
             self.device = evnt.device
             self.history = evnt.history
             self.history_length = evnt.history_length
             self.history_length_factor = evnt.history_length_factor
 
-        user_keys.append((name, scan_codes, is_keypad, self))
+        self.registry.user_keys.append((name, scan_codes, is_keypad, self))
+        self.registry.user_key_index.setdefault((name, is_keypad), self)
         return self
 
     @staticmethod
     def _keys_from_string(keys: str):
-        """Getting a list of keys from the string of keys where they are + seperated"""
-        if keys != "+":
-            keys = keys.split("+")
-        else:
-            keys = [
-                "+",
-            ]
-        return keys
+        """Getting a list of key names from a hotkey string consisting of a single chord, see parse_hotkey"""
+        return parse_chord(keys).names
+
+    @staticmethod
+    def _keys_from_chord(
+        chord: ChordSpec, is_keypad: bool = False, device=None, registry: KeyRegistry = None
+    ) -> list["Key"]:
+        "Get the keys of a parsed chord, the qualifiers of a key take precedence over is_keypad and device."
+        return [
+            Key.get_key(
+                k.name,
+                is_keypad if k.is_keypad is None else k.is_keypad,
+                device if k.device is None else k.device,
+                registry,
+            )
+            for k in chord.keys
+        ]
 
     @staticmethod
-    def get_key(name: str, is_keypad: bool = False):
-        key = Key.keys.get(name)
-        try:
-            kpd = key.is_keypad
-        except:
-            kpd = None
-        if not key or kpd != is_keypad:
-            key = Key._from_name(name, is_keypad)
+    def get_key(
+        name: str, is_keypad: bool = False, device=None, registry: KeyRegistry = None
+    ):
+        if registry is None:
+            registry = default_registry
+        with registry.lock:
+            key = registry.user_key_index.get((name, is_keypad))
+            if key is None:
+                key = Key._from_name(name, is_keypad, registry)
+            if device is not None:
+                key = key.get_device_key(device)
         return key
 
     def recalculate_history_length(self):
-        binds = [bind for bind in self.bindings.values() if bind.type == "multipress"]
-        if len(binds) == 0:
-            self.history_length = 0
-        else:
-            presses = []
-            for bind in binds:
-                for key, multi_dict in bind.keys_to_multipress_times.items():
-                    if key == self:
-                        presses.append(multi_dict["presses"])
-            self.history_length = max(presses) * self.history_length_factor
+        "Rebuild the needed presses of the multipress bindings of this key from scratch and update the history length."
+        with self.registry.lock:
+            self._presses_counts = {}
+            for bind in self.bindings.values():
+                if bind.type == "multipress":
+                    presses = bind.keys_to_multipress_times[self]["presses"]
+                    self._presses_counts[presses] = self._presses_counts.get(presses, 0) + 1
+            self._presses_heap = [-p for p in self._presses_counts]
+            heapq.heapify(self._presses_heap)
+            self._update_history_length()
+
+    def _update_history_length(self):
+        "Set the history length from the highest needed presses, dropping stale heap entries on the way."
+        heap = self._presses_heap
+        if len(heap) > 2 * len(self._presses_counts):
+            heap = self._presses_heap = [-p for p in self._presses_counts]
+            heapq.heapify(heap)
+        while heap and -heap[0] not in self._presses_counts:
+            heapq.heappop(heap)
+        self.history_length = -heap[0] * self.history_length_factor if heap else 0
 
 
 class Binding:
@@ -225,7 +986,7 @@ class Binding:
 
     def __init__(
         self,
-        _id: uuid.UUID,
+        _id: int,
         callback: typing.Callable,
         _type: str,
         args: typing.Iterable = None,
@@ -238,6 +999,7 @@ class Binding:
         send_hold_duration: bool = False,
         hold_duration_kw: str = "hold_duration",
         hold_duration_mode: str = "min",  # "min" | "max" | "dict"
+        suppress: bool = False,
     ) -> None:
         assert _type in Binding.types
         self.id = _id
@@ -249,7 +1011,11 @@ class Binding:
         self.args = args
         self.fire_when_hold = fire_when_hold
         self.max_delay = max_delay
+        self.suppress = suppress
+        "Whether a suppressing listener blocks the events of this hotkey, see SuppressionTable."
         self.did_fire = False
+        self.failed_condition = None
+        "Name of the condition that failed on the last evaluation (max_delay, case1 to case4 or did_fire) - None if the conditions were met."
 
         # NEW:
         self.send_hold_duration = send_hold_duration
@@ -262,6 +1028,25 @@ class Binding:
             + list(keys_to_hold_times.keys())
             + list(keys_to_multipress_times.keys())
         )
+        self.registry: KeyRegistry = (
+            self.keys[0].registry if self.keys else default_registry
+        )
+
+        self.down_mask = 0
+        "Bitset of the keys that need to be down."
+        self.up_mask = 0
+        "Bitset of the keys that need to be up."
+        if _type == "normal":
+            required_states = keys_to_states.items()
+        else:
+            required_states = [
+                (k, v["state"]) for k, v in keys_to_multipress_times.items()
+            ]
+        for k, state in required_states:
+            if state != "up":
+                self.down_mask |= k.bit
+            if state != "down":
+                self.up_mask |= k.bit  # invalid states end up in both masks and can never be met
 
     def __call__(self, key: Key):
         if self.check_conditions(key):
@@ -269,16 +1054,32 @@ class Binding:
             if self.type == "hold" and self.send_hold_duration:
                 kwargs[self.hold_duration_kw] = self._last_hold_duration_payload
 
-            if self.args:
+            watchdog = self.registry.watchdog
+            if watchdog is not None:
+                watchdog.call(self, self.args or (), kwargs)
+            elif self.args:
                 self.callback(*self.args, **kwargs)
             else:
                 self.callback(**kwargs)
+            return True
+        return False
+
+    def get_max_delay(self) -> float:
+        "The max_delay of this binding or the adaptive max_delay if that is higher."
+        adaptive = self.registry.adaptive_max_delay
+        if adaptive is not None and adaptive > self.max_delay:
+            return adaptive
+        return self.max_delay
 
     def check_conditions(self, key: Key):
-        if not time() - key.last_update < self.max_delay: return False
+        max_delay = self.get_max_delay()
+        if not time() - key.last_update < max_delay:
+            self.failed_condition = "max_delay"
+            return False
         if self.type == "normal":
-            case1 = all(
-                [k.state == v for k, v in self.keys_to_states.items()]
+            case1 = (
+                (self.registry.pressed_mask & self.down_mask) == self.down_mask
+                and (self.registry.released_mask & self.up_mask) == self.up_mask
             )  # check if all the keys are in the correct state
 
             case2 = (
@@ -292,8 +1093,14 @@ class Binding:
                 else True
             )
 
-            case3 = all([time() - k.last_update < self.max_delay for k in self.keys_to_states.keys()])
+            case3 = all([time() - k.last_update < max_delay for k in self.keys_to_states.keys()])
 
+            self.failed_condition = (
+                "case1" if not case1
+                else "case2" if not case2
+                else "case3" if not case3
+                else None
+            )
             return case1 and case2 and case3
 
         elif self.type == "hold":
@@ -318,7 +1125,7 @@ class Binding:
             case3 = not any(
                 [k.last_state_change == 0 for k, v in self.keys_to_hold_times.items()]
             )
-            case4 = all([time() - k.last_update < self.max_delay for k in self.keys_to_hold_times.keys()])
+            case4 = all([time() - k.last_update < max_delay for k in self.keys_to_hold_times.keys()])
 
             if case1 and case3 and case4:
                 if (not case2 and not self.did_fire) or self.fire_when_hold:
@@ -339,9 +1146,14 @@ class Binding:
                         )
 
                     self.did_fire = True
+                    self.failed_condition = None
                     return True
+                self.failed_condition = "case2" if case2 else "did_fire"
             elif not case1:
                 self.did_fire = False
+                self.failed_condition = "case1"
+            else:
+                self.failed_condition = "case3" if not case3 else "case4"
 
             return False
 
@@ -365,14 +1177,12 @@ class Binding:
                 if not self.fire_when_hold
                 else True
             )
-            case3 = all(
-                [
-                    k.state == v["state"]
-                    for k, v in self.keys_to_multipress_times.items()
-                ]
+            case3 = (
+                (self.registry.pressed_mask & self.down_mask) == self.down_mask
+                and (self.registry.released_mask & self.up_mask) == self.up_mask
             )  # check whether all keys are in the correct state
 
-            case4 = all([time() - k.last_update < self.max_delay for k in self.keys_to_multipress_times.keys()])
+            case4 = all([time() - k.last_update < max_delay for k in self.keys_to_multipress_times.keys()])
 
             if self.did_fire and case2 and case3:
                 case1 = True  # case1 is False when key is hold down -> to fire when hold down, set it to True
@@ -380,8 +1190,47 @@ class Binding:
                 self.did_fire = True
             else:
                 self.did_fire = False
+            self.failed_condition = (
+                "case1" if not case1
+                else "case2" if not case2
+                else "case3" if not case3
+                else "case4" if not case4
+                else None
+            )
             return case1 and case2 and case3 and case4
 
+    def get_transitions(self, key: Key):
+        """Get the transitions of the key this binding has to be evaluated on and those on which only its fire latch has to be reset. On all other transitions of the key the binding can't be met.
+
+        Args:
+            key (Key): One of the keys of this binding.
+
+        Returns:
+            tuple[tuple[str], tuple[str]]: The transitions to evaluate on and the transitions to reset on.
+        """
+        down = ("press", "repeat")
+        up = ("release", "release_repeat")
+        if self.type == "normal":
+            state = self.keys_to_states[key]
+            return (down if state == "down" else up if state == "up" else ()), ()
+        elif self.type == "multipress":
+            state = self.keys_to_multipress_times[key]["state"]
+            evaluate = down if state == "down" else up if state == "up" else ()
+            return evaluate, tuple(t for t in Key.transitions if t not in evaluate)
+        elif self.type == "hold":
+            # a state change of a fresh event makes the hold time of the key smaller than max_delay
+            if self.keys_to_hold_times[key] >= self.max_delay:
+                return ("repeat", "release_repeat"), ("press", "release")
+            return Key.transitions, ()
+
+    def reset(self, key: Key):
+        "Reset the fire latch the same way check_conditions does for an event that can't meet the conditions."
+        max_delay = self.get_max_delay()
+        if time() - key.last_update < max_delay:
+            if self.type == "hold" and self.keys_to_hold_times[key] < max_delay:
+                return self(key)  # with a raised max_delay the hold time may be met already
+            self.did_fire = False
+
     @staticmethod
     def get_amount_of_states_in_time_span(
         key: Key,
@@ -403,12 +1252,15 @@ def bind_hotkey(
     fire_when_hold: bool = False,
     send_keys: bool = False,
     is_keypad: bool = False,
-    max_delay: float = 0.01
+    max_delay: float = 0.01,
+    device=None,
+    registry: KeyRegistry = None,
+    suppress: bool = False,
 ):
     """Add a normal hotkey to the given keys.
 
     Args:
-        keys (str): The keys as a string, if multiple keys seperated by '+' (+ is than plus).
+        keys (str): The keys as a string, if multiple keys seperated by '+' (+ is than plus). Keys may be qualified with [kp] or [dev=...], see parse_hotkey.
         callback (typing.Callable): Your callback, which is called when all criteria are met.
         args (typing.Iterable, optional): Your arguments to be passed to the callback function. Defaults to None.
         state (str, optional): The respective state of the button, which can be either "down" or "up". Defaults to "down".
@@ -417,20 +1269,33 @@ def bind_hotkey(
         send_keys (bool, optional): Add all the keys as a list to the arguments at position 0. Defaults to False.
         is_keypad (bool, optional): All buttons on the keypad are only active if this option is set to True, but this also deactivates all buttons that are not part of the keypad. Defaults to False.
         max_delay (float, optional): The maximum delay in seconds between the keyboard event and the trigger of the callback. Defaults to 0.01.
+        device (optional): Only events of this device (event.device) are relevant for the hotkey. The state of the keys is tracked separately for each targeted device. Defaults to None, which means any device.
+        registry (KeyRegistry, optional): The registry the hotkey is added to, see KeyboardListener. Defaults to None, which means the default registry.
+        suppress (bool, optional): A KeyboardListener with suppress=True blocks the press, repeats and release of the last key of the hotkey while exactly the other keys are held down. The state must be "down" and no device can be given - the hook decides before the events are told apart by device, so a suppressing binding of one device would swallow the keys of all others. Defaults to False.
+
+    Raises:
+        ValueError: If suppress is combined with keys_to_states, a state other than "down" or a device.
 
     Returns:
-        UUID: The id needed to remove the binding using the remove_binding function.
+        int: The id needed to remove the binding using the remove_binding function.
     """
-    if not keys_to_states:
-        keys_to_states = {k: state for k in Key._keys_from_string(keys)}
+    if suppress and (state != "down" or keys_to_states):
+        raise ValueError('suppress requires the keys as string and state "down"')
     _keys_to_states = {}
-    for k, state in keys_to_states.items():
-        if isinstance(state, str):
-            key = Key.get_key(k, is_keypad)
+    if not keys_to_states:
+        chord = parse_chord(keys, ("normal",))
+        if suppress and (device is not None or any(k.device is not None for k in chord.keys)):
+            raise ValueError("suppress can't be limited to a device")
+        for key in Key._keys_from_chord(chord, is_keypad, device, registry):
             _keys_to_states[key] = state
-        else:
-            key = Key.get_key(k, state[1])
-            _keys_to_states[key] = state[0]
+    else:
+        for k, state in keys_to_states.items():
+            if isinstance(state, str):
+                key = Key.get_key(k, is_keypad, device, registry)
+                _keys_to_states[key] = state
+            else:
+                key = Key.get_key(k, state[1], device, registry)
+                _keys_to_states[key] = state[0]
     keys_to_states = _keys_to_states.copy()
     if send_keys:
         key_args = [k for k in keys_to_states.keys()]
@@ -443,7 +1308,7 @@ def bind_hotkey(
             + list(args)
         )
 
-    binding_id = uuid.uuid4()
+    binding_id = next(Key._binding_ids)
     binding = Binding(
         _id=binding_id,
         callback=callback,
@@ -452,10 +1317,15 @@ def bind_hotkey(
         keys_to_states=keys_to_states,
         fire_when_hold=fire_when_hold,
         max_delay=max_delay,
+        suppress=suppress,
     )
-    for key in keys_to_states:
-        key.bindings[binding_id] = binding
-    Key._general_bindings[binding_id] = binding
+    with binding.registry.lock:
+        for key in keys_to_states:
+            key.add_binding(binding)
+        binding.registry.bindings[binding_id] = binding
+        if suppress:
+            binding.registry._publish_suppression()
+        binding.registry._bindings_changed()
     return binding_id
 
 
@@ -472,11 +1342,14 @@ def bind_hotkey_hold(
     send_hold_duration: bool = False,
     hold_duration_kw: str = "hold_duration",
     hold_duration_mode: str = "min",  # "min" | "max" | "dict"
+    device=None,
+    registry: KeyRegistry = None,
 ):
     """Add a hotkey that requires the buttons to be held down.
 
     Args:
-        keys (str): The keys as a string, if multiple keys separated by '+' ('+' itself is written as '+').
+        keys (str): The keys as a string, if multiple keys separated by '+' ('+' itself is written as '+'). Keys may be
+            qualified with [kp] or [dev=...] and a hold time may be appended, e.g. "ctrl+k~1.5s", see parse_hotkey.
         callback (typing.Callable): Your callback, which is called when all criteria are met.
         args (typing.Iterable, optional): Positional arguments passed to the callback. Defaults to None.
         time_span (float, optional): The period of time for which the keys have to be held down (seconds). Defaults to 1.
@@ -501,20 +1374,29 @@ def bind_hotkey_hold(
             - "max": the maximum duration across all keys
             - "dict": a dict mapping Key -> duration_seconds
             Defaults to "min".
+        device (optional): Only events of this device (event.device) are relevant for the hotkey. The state of the
+            keys is tracked separately for each targeted device. Defaults to None, which means any device.
+        registry (KeyRegistry, optional): The registry the hotkey is added to, see KeyboardListener. Defaults to
+            None, which means the default registry.
 
     Returns:
-        UUID: The id needed to remove the binding using the remove_binding function.
+        int: The id needed to remove the binding using the remove_binding function.
     """
-    if not keys_to_hold_times:
-        keys_to_hold_times = {k: time_span for k in Key._keys_from_string(keys)}
     _keys_to_hold_times = {}
-    for k, v in keys_to_hold_times.items():
-        if isinstance(v, float) or isinstance(v, int):
-            key = Key.get_key(k, is_keypad)
-            _keys_to_hold_times[key] = v
-        else:
-            key = Key.get_key(k, v[1])
-            _keys_to_hold_times[key] = v[0]
+    if not keys_to_hold_times:
+        chord = parse_chord(keys, ("normal", "hold"))
+        if chord.time_span is not None:
+            time_span = chord.time_span
+        for key in Key._keys_from_chord(chord, is_keypad, device, registry):
+            _keys_to_hold_times[key] = time_span
+    else:
+        for k, v in keys_to_hold_times.items():
+            if isinstance(v, float) or isinstance(v, int):
+                key = Key.get_key(k, is_keypad, device, registry)
+                _keys_to_hold_times[key] = v
+            else:
+                key = Key.get_key(k, v[1], device, registry)
+                _keys_to_hold_times[key] = v[0]
     keys_to_hold_times = _keys_to_hold_times.copy()
     if send_keys:
         key_args = [k for k in keys_to_hold_times.keys()]
@@ -527,7 +1409,7 @@ def bind_hotkey_hold(
             + list(args)
         )
 
-    binding_id = uuid.uuid4()
+    binding_id = next(Key._binding_ids)
     binding = Binding(
         _id=binding_id,
         callback=callback,
@@ -541,9 +1423,11 @@ def bind_hotkey_hold(
         hold_duration_kw=hold_duration_kw,
         hold_duration_mode=hold_duration_mode,
     )
-    for key in keys_to_hold_times:
-        key.bindings[binding_id] = binding
-    Key._general_bindings[binding_id] = binding
+    with binding.registry.lock:
+        for key in keys_to_hold_times:
+            key.add_binding(binding)
+        binding.registry.bindings[binding_id] = binding
+        binding.registry._bindings_changed()
     return binding_id
 
 
@@ -558,12 +1442,14 @@ def bind_hotkey_multipress(
     fire_when_hold: bool = False,
     send_keys: bool = False,
     is_keypad: bool = False,
-    max_delay: float = 0.01
+    max_delay: float = 0.01,
+    device=None,
+    registry: KeyRegistry = None,
 ):
     """Add a hotkey that requires the keys to be pressed repeatedly.
 
     Args:
-        keys (str): The keys as a string, if multiple keys seperated by '+' (+ is than plus).
+        keys (str): The keys as a string, if multiple keys seperated by '+' (+ is than plus). Keys may be qualified with [kp] or [dev=...] and the presses and time span may be appended, e.g. "ctrl+k*3@0.5s", see parse_hotkey.
         callback (typing.Callable): Your callback, which is called when all criteria are met.
         args (typing.Iterable, optional): Your arguments to be passed to the callback function. Defaults to None.
         time_span (float, optional): The period of time in which the presses must take place. Defaults to 0.5.
@@ -574,24 +1460,34 @@ def bind_hotkey_multipress(
         send_keys (bool, optional): Add all the keys as a list to the arguments at position 0. Defaults to False.
         is_keypad (bool, optional): All buttons on the keypad are only active if this option is set to True, but this also deactivates all buttons that are not part of the keypad. Defaults to False.
         max_delay (float, optional): The maximum delay in seconds between the keyboard event and the trigger of the callback. Defaults to 0.01.
+        device (optional): Only events of this device (event.device) are relevant for the hotkey. The state and history of the keys is tracked separately for each targeted device. Defaults to None, which means any device.
+        registry (KeyRegistry, optional): The registry the hotkey is added to, see KeyboardListener. Defaults to None, which means the default registry.
 
     Returns:
-        UUID: The id needed to remove the binding using the remove_binding function.
+        int: The id needed to remove the binding using the remove_binding function.
     """
-    if not keys_to_multipress_times:
-        keys_to_multipress_times = {
-            k: {"state": state, "time_span": time_span, "presses": presses}
-            for k in Key._keys_from_string(keys)
-        }
     _keys_to_multipress_times = {}
-    for k, v in keys_to_multipress_times.items():
-        kpad = v.get("is_keypad")
-        if kpad != None:
-            key = Key.get_key(k, v["is_keypad"])
-            _keys_to_multipress_times[key] = v
-        else:
-            key = Key.get_key(k, is_keypad)
-            _keys_to_multipress_times[key] = v
+    if not keys_to_multipress_times:
+        chord = parse_chord(keys, ("normal", "multipress"))
+        if chord.presses is not None:
+            presses = chord.presses
+        if chord.time_span is not None:
+            time_span = chord.time_span
+        for key in Key._keys_from_chord(chord, is_keypad, device, registry):
+            _keys_to_multipress_times[key] = {
+                "state": state,
+                "time_span": time_span,
+                "presses": presses,
+            }
+    else:
+        for k, v in keys_to_multipress_times.items():
+            kpad = v.get("is_keypad")
+            if kpad != None:
+                key = Key.get_key(k, v["is_keypad"], device, registry)
+                _keys_to_multipress_times[key] = v
+            else:
+                key = Key.get_key(k, is_keypad, device, registry)
+                _keys_to_multipress_times[key] = v
     keys_to_multipress_times = _keys_to_multipress_times.copy()
     if send_keys:
         key_args = [k for k in keys_to_multipress_times.keys()]
@@ -604,7 +1500,7 @@ def bind_hotkey_multipress(
             + list(args)
         )
 
-    binding_id = uuid.uuid4()
+    binding_id = next(Key._binding_ids)
     binding = Binding(
         _id=binding_id,
         callback=callback,
@@ -614,38 +1510,56 @@ def bind_hotkey_multipress(
         fire_when_hold=fire_when_hold,
         max_delay=max_delay,
     )
-    for key in keys_to_multipress_times:
-        key.bindings[binding_id] = binding
-    Key._general_bindings[binding_id] = binding
-    for key in keys_to_multipress_times:
-        key.recalculate_history_length()
+    with binding.registry.lock:
+        for key in keys_to_multipress_times:
+            key.add_binding(binding)
+        binding.registry.bindings[binding_id] = binding
+        binding.registry._bindings_changed()
     return binding_id
 
 
-def remove_binding(hotkey_id):
+def remove_binding(hotkey_id, registry: KeyRegistry = None):
     """Remove a hotkey created using one of the following functions:
     - `bind_hotkey`
     - `bind_hotkey_hold`
     - `bind_hotkey_multipress`
 
     Args:
-        hotkey_id (UUID): The id needed to remove the hotkey. This is the return value of the functions listed above.
+        hotkey_id (int): The id needed to remove the hotkey. This is the return value of the functions listed above.
+        registry (KeyRegistry, optional): The registry the hotkey was added to. Defaults to None, which means the default registry.
     """
-    binding: Binding = Key._general_bindings[hotkey_id]
-    if binding.type == "multipress":
+    if registry is None:
+        registry = default_registry
+    with registry.lock:
+        binding: Binding = registry.bindings[hotkey_id]
         for key in binding.keys:
-            key.recalculate_history_length()
-    for key in binding.keys:
-        key.bindings.pop(hotkey_id)
-    Key._general_bindings.pop(hotkey_id)
+            key.remove_binding(hotkey_id)
+        registry.bindings.pop(hotkey_id)
+        if registry.watchdog is not None:
+            registry.watchdog.forget(hotkey_id)
+        if binding.suppress:
+            registry._publish_suppression()
+        registry._bindings_changed()
 
 
-def remove_all_bindings():
+def remove_all_bindings(registry: KeyRegistry = None):
     """Remove all hotkeys created using one of the following functions:
     - `bind_hotkey`
     - `bind_hotkey_hold`
     - `bind_hotkey_multipress`
+
+    Args:
+        registry (KeyRegistry, optional): The registry to clear. Defaults to None, which means the default registry.
     """
-    ids = list(Key._general_bindings.keys())
-    for hotkey_id in ids:
-        remove_binding(hotkey_id)
+    if registry is None:
+        registry = default_registry
+    with registry.lock:
+        keys = {key for binding in registry.bindings.values() for key in binding.keys}
+        for key in keys:
+            key.clear_bindings()
+        if registry.watchdog is not None:
+            for hotkey_id in registry.bindings:
+                registry.watchdog.forget(hotkey_id)
+        registry.bindings.clear()
+        registry._publish_suppression()
+        registry._bindings_changed()
@@ -0,0 +1,295 @@
+import asyncio
+import queue
+import threading
+import typing
+from collections import deque
+
+
+class _Summary:
+    "Count, sum, min and max of a stream of durations."
+
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "_Summary"):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, float | None]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class _Bucket:
+    "The aggregates of one step of the window."
+
+    __slots__ = ("index", "presses", "dwell", "flight")
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        "The bucket covers index * step until (index + 1) * step, computed this way to avoid summing up rounding errors."
+        self.presses = 0
+        self.dwell = _Summary()
+        self.flight = _Summary()
+
+
+class MetricsWindow:
+    """The typing metrics of a closed window.
+
+    Args:
+        start (float): Start of the window (event time in seconds).
+        end (float): End of the window, exclusive.
+        presses (int): The amount of key presses (up -> down, repeats are not counted).
+        dwell (dict[str, float | None]): Count, mean, min and max of the time keys were held down (down -> up) for the releases in this window.
+        flight (dict[str, float | None]): Count, mean, min and max of the time between releasing a key and the next press for the presses in this window.
+    """
+
+    def __init__(
+        self,
+        start: float,
+        end: float,
+        presses: int,
+        dwell: dict[str, float | None],
+        flight: dict[str, float | None],
+    ) -> None:
+        self.start = start
+        self.end = end
+        self.presses = presses
+        self.dwell = dwell
+        self.flight = flight
+
+    @property
+    def keys_per_minute(self) -> float:
+        return self.presses * 60 / (self.end - self.start)
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "presses": self.presses,
+            "keys_per_minute": self.keys_per_minute,
+            "dwell": self.dwell,
+            "flight": self.flight,
+        }
+
+    def __str__(self) -> str:
+        return f"MetricsWindow object: start: {self.start}, end: {self.end}, keys_per_minute: {self.keys_per_minute}, dwell: {self.dwell}, flight: {self.flight}"
+
+
+class TypingMetrics:
+    """Streaming keys per minute, dwell time (down -> up) and flight time (up -> next down) over tumbling or sliding windows.
+
+    Every event updates the aggregates of the current step in constant time, the history is never scanned. A window consists of window / step steps kept in a ring, so the memory doesn't depend on the amount of events. Windows are emitted when the first event after their end arrives (or on flush), windows without any event are not emitted.
+
+    Example:
+        metrics = TypingMetrics(window=60, step=10)
+        listener.add_observer(metrics)
+        for window in metrics.stream():
+            print(window.keys_per_minute)
+
+    Args:
+        window (float, optional): Length of a window in seconds. Defaults to 60.
+        step (float, optional): Sliding windows are emitted every step seconds, window must be a multiple of it. Defaults to None, which means tumbling windows (step = window).
+    """
+
+    def __init__(self, window: float = 60, step: float = None) -> None:
+        step = window if step is None else step
+        steps = round(window / step)
+        if step <= 0 or steps < 1 or abs(steps * step - window) > 1e-9 * window:
+            raise ValueError("window must be a positive multiple of step")
+        self.window = window
+        self.step = step
+        self._ring: deque[_Bucket] = deque(maxlen=steps)
+        "the latest closed steps"
+        self._current: _Bucket = None
+        self._pressed_at: dict = {}
+        "key to the time it was pressed, only keys currently down"
+        self._last_release: float = None
+        self._lock = threading.Lock()
+        self._subscribers: tuple[typing.Callable, ...] = ()
+        self.dropped = 0
+        "Windows not delivered because the queue of a subscriber was full."
+
+    def __call__(self, key, event):
+        "Observer for KeyboardListener.add_observer."
+        self.add(key, event.event_type, event.time)
+
+    def add(self, key: typing.Hashable, event_type: str, event_time: float):
+        """Add a single event.
+
+        Args:
+            key (typing.Hashable): Identifies the key, e.g. the Key object or its name.
+            event_type (str): "down" or "up".
+            event_time (float): Time of the event in seconds.
+        """
+        with self._lock:
+            closed = self._advance(event_time)
+            bucket = self._current
+            if event_type == "down":
+                if key not in self._pressed_at:  # repeats are ignored
+                    bucket.presses += 1
+                    self._pressed_at[key] = event_time
+                    if self._last_release is not None:
+                        bucket.flight.add(event_time - self._last_release)
+            else:
+                pressed_at = self._pressed_at.pop(key, None)
+                if pressed_at is not None:
+                    bucket.dwell.add(event_time - pressed_at)
+                    self._last_release = event_time
+        self._publish(closed)
+
+    def flush(self, now: float):
+        """Emit the windows which ended before now, e.g. from a timer while nobody types.
+
+        Args:
+            now (float): The current time in seconds, comparable with the event times.
+        """
+        with self._lock:
+            closed = self._advance(now) if self._current is not None else []
+        self._publish(closed)
+
+    def _advance(self, now: float) -> list[MetricsWindow]:
+        current = self._current
+        step = self.step
+        if current is None:
+            self._current = _Bucket(int(now // step))
+            return []
+        closed = []
+        while now >= (current.index + 1) * step:
+            self._ring.append(current)
+            index = current.index + 1
+            if any(b.presses or b.dwell.count for b in self._ring):
+                closed.append(self._window(index))
+            elif now >= (index + 1) * step:  # only empty steps left, skip the gap
+                index = int(now // step)
+            current = _Bucket(index)
+        self._current = current
+        return closed
+
+    def _window(self, end_index: int) -> MetricsWindow:
+        presses = 0
+        dwell, flight = _Summary(), _Summary()
+        start_index = end_index - self._ring.maxlen
+        for bucket in self._ring:
+            if bucket.index >= start_index:
+                presses += bucket.presses
+                dwell.merge(bucket.dwell)
+                flight.merge(bucket.flight)
+        return MetricsWindow(
+            start_index * self.step,
+            end_index * self.step,
+            presses,
+            dwell.as_dict(),
+            flight.as_dict(),
+        )
+
+    def _publish(self, windows: list[MetricsWindow]):
+        for window in windows:
+            for subscriber in self._subscribers:
+                subscriber(window)
+
+    def subscribe(self, callback: typing.Callable) -> typing.Callable:
+        """Call callback(window) for every emitted MetricsWindow. It runs on the thread processing the events.
+
+        Returns:
+            typing.Callable: The subscriber, needed to unsubscribe.
+        """
+        self._subscribers = self._subscribers + (callback,)
+        return callback
+
+    def unsubscribe(self, subscriber: typing.Callable):
+        self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+
+    def subscribe_queue(self, maxsize: int = 0) -> tuple[queue.Queue, typing.Callable]:
+        """Put every emitted MetricsWindow into a queue.Queue to consume it from another thread. Windows are dropped (counted in dropped) while the queue is full.
+
+        Returns:
+            tuple[queue.Queue, typing.Callable]: The queue and the subscriber, needed to unsubscribe.
+        """
+        windows = queue.Queue(maxsize)
+
+        def subscriber(window: MetricsWindow):
+            try:
+                windows.put_nowait(window)
+            except queue.Full:
+                self.dropped += 1
+
+        return windows, self.subscribe(subscriber)
+
+    def subscribe_asyncio(
+        self, maxsize: int = 0, loop: asyncio.AbstractEventLoop = None
+    ) -> tuple[asyncio.Queue, typing.Callable]:
+        """Put every emitted MetricsWindow into an asyncio.Queue of the given event loop.
+
+        Args:
+            maxsize (int, optional): Windows are dropped while the queue is full. Defaults to 0.
+            loop (asyncio.AbstractEventLoop, optional): Defaults to None, which means the running loop.
+
+        Returns:
+            tuple[asyncio.Queue, typing.Callable]: The queue and the subscriber, needed to unsubscribe.
+        """
+        loop = loop if loop is not None else asyncio.get_running_loop()
+        windows = asyncio.Queue(maxsize)
+
+        def put(window: MetricsWindow):
+            try:
+                windows.put_nowait(window)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+        def subscriber(window: MetricsWindow):
+            loop.call_soon_threadsafe(put, window)
+
+        return windows, self.subscribe(subscriber)
+
+    def stream(self, timeout: float = None) -> typing.Iterator[MetricsWindow]:
+        """Generator of the emitted windows, for consumers on another thread.
+
+        Args:
+            timeout (float, optional): Stop when no window was emitted for this many seconds. Defaults to None, which means never.
+        """
+        windows, subscriber = self.subscribe_queue()
+        try:
+            while True:
+                try:
+                    yield windows.get(timeout=timeout)
+                except queue.Empty:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def astream(self) -> typing.AsyncIterator[MetricsWindow]:
+        "Asynchronous generator of the emitted windows."
+        windows, subscriber = self.subscribe_asyncio()
+        try:
+            while True:
+                yield await windows.get()
+        finally:
+            self.unsubscribe(subscriber)
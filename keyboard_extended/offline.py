@@ -0,0 +1,313 @@
+"""Evaluate bindings over recorded keyboard events without replaying them through the hook.
+
+The conditions of bind_hotkey, bind_hotkey_hold and bind_hotkey_multipress are computed with vectorized NumPy operations over the whole log, so many configurations (time_span, presses, max_delay, ...) can be compared over weeks of keystrokes. NumPy is an optional dependency: pip install keyboard_extended[offline].
+
+The log is evaluated as if every event reached the hook without any lag, i.e. `time()` during the evaluation equals the time of the event. Keys are matched by name.
+"""
+import json
+import typing
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "keyboard_extended.offline requires NumPy: pip install keyboard_extended[offline]"
+        )
+
+
+def _keys_from_string(keys: str) -> list[str]:
+    from .keyboard_extended import Key
+
+    return Key._keys_from_string(keys)
+
+
+class EventLog:
+    """Recorded keyboard events as NumPy arrays.
+
+    Args:
+        times (typing.Iterable[float]): The times of the events in seconds, in ascending order.
+        names (typing.Iterable[str]): The names of the keys.
+        event_types (typing.Iterable[str]): "down" or "up" for every event.
+    """
+
+    def __init__(
+        self,
+        times: typing.Iterable[float],
+        names: typing.Iterable[str],
+        event_types: typing.Iterable[str],
+    ) -> None:
+        _require_numpy()
+        names = list(names)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.key_names: list[str] = sorted(set(names))
+        "key id to name"
+        self.key_ids: dict[str, int] = {n: i for i, n in enumerate(self.key_names)}
+        "name to key id"
+        self.keys = np.fromiter(
+            (self.key_ids[n] for n in names), dtype=np.int32, count=len(names)
+        )
+        self.downs = np.fromiter(
+            (t == "down" for t in event_types), dtype=bool, count=len(names)
+        )
+        if not len(self.times) == len(self.keys) == len(self.downs):
+            raise ValueError("times, names and event_types must have the same length")
+        if len(self.times) > 1 and np.any(np.diff(self.times) < 0):
+            raise ValueError("the events must be sorted by time")
+        self.index = np.arange(len(self.times))
+        self.changes = self._state_changes()
+        "Whether the event changed the state of its key (True) or was a repeat."
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_events(cls, events: typing.Iterable) -> "EventLog":
+        "Create the log from KeyboardEvents, e.g. the result of keyboard.record."
+        events = list(events)
+        return cls(
+            [e.time for e in events],
+            [e.name for e in events],
+            [e.event_type for e in events],
+        )
+
+    @classmethod
+    def from_json_lines(cls, path: str) -> "EventLog":
+        "Create the log from a file with one KeyboardEvent.to_json() per line."
+        times, names, event_types = [], [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    times.append(event["time"])
+                    names.append(event["name"])
+                    event_types.append(event["event_type"])
+        return cls(times, names, event_types)
+
+    def _state_changes(self):
+        # previous event of the same key: sort by key, keep the time order within a key
+        order = np.lexsort((self.index, self.keys))
+        keys, downs = self.keys[order], self.downs[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        changed_sorted = first.copy()
+        changed_sorted[1:] |= downs[1:] != downs[:-1]
+        changes = np.empty(len(order), dtype=bool)
+        changes[order] = changed_sorted
+        return changes
+
+    def key_state(self, name: str):
+        """The state of a key at every event of the log (after the event was processed).
+
+        Returns:
+            tuple: Arrays of the state (1 down, 0 up, -1 no event yet), the time of the last event and the time of the last state change of the key (NaN before its first event).
+        """
+        if name in self._cache:
+            return self._cache[name]
+        key_id = self.key_ids.get(name, -1)
+        mine = self.keys == key_id
+        last = np.maximum.accumulate(np.where(mine, self.index, -1))
+        last_change = np.maximum.accumulate(
+            np.where(mine & self.changes, self.index, -1)
+        )
+        seen = last >= 0
+        state = np.where(seen, self.downs[last].astype(np.int8), np.int8(-1))
+        last_update = np.where(seen, self.times[last], np.nan)
+        last_state_change = np.where(seen, self.times[last_change], np.nan)
+        self._cache[name] = state, last_update, last_state_change
+        return self._cache[name]
+
+    def events_of(self, names: typing.Iterable[str]):
+        "Mask of the events of the given keys - the events a binding of these keys is evaluated on."
+        ids = [self.key_ids[n] for n in names if n in self.key_ids]
+        return np.isin(self.keys, ids)
+
+
+def _round1(values):
+    # round(x, 1) of Python rounds the exact binary value, np.round scales by 10 first and may round the other way at the .x5 edges (1008.55)
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    edge = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if edge.any():
+        rounded[edge] = [round(float(v), 1) for v in values[edge]]
+    return rounded
+
+
+def _just_changed(now, last_state_changes):
+    # case2 of Binding.check_conditions: round(time(), 1) == round(k.last_state_change, 1) for any key
+    rounded = _round1(now)
+    result = np.zeros(len(now), dtype=bool)
+    for last_state_change in last_state_changes:
+        result |= rounded == _round1(last_state_change)
+    return result
+
+
+def _fresh(now, last_updates, max_delay):
+    result = np.ones(len(now), dtype=bool)
+    for last_update in last_updates:
+        result &= now - last_update < max_delay
+    return result
+
+
+def hotkey_fire_times(
+    log: EventLog,
+    keys: str,
+    state: str = "down",
+    keys_to_states: dict[str, str] = None,
+    fire_when_hold: bool = False,
+    max_delay: float = 0.01,
+):
+    """The times at which a binding added with bind_hotkey would have fired. The arguments are the same as for bind_hotkey.
+
+    Returns:
+        numpy.ndarray: The times of the events that triggered the callback.
+    """
+    if not keys_to_states:
+        keys_to_states = {k: state for k in _keys_from_string(keys)}
+    evaluated = log.events_of(keys_to_states)
+    now = log.times[evaluated]
+    states = [
+        (log.key_state(k), {"down": 1, "up": 0}.get(s, -2))
+        for k, s in keys_to_states.items()
+    ]
+    case1 = np.ones(len(now), dtype=bool)
+    for (key_state, _, _), required in states:
+        case1 &= key_state[evaluated] == required
+    case2 = (
+        _just_changed(now, [lsc[evaluated] for (_, _, lsc), _ in states])
+        if not fire_when_hold
+        else True
+    )
+    case3 = _fresh(now, [lu[evaluated] for (_, lu, _), _ in states], max_delay)
+    return now[case1 & case2 & case3]
+
+
+def hotkey_hold_fire_times(
+    log: EventLog,
+    keys: str,
+    time_span: float = 1,
+    keys_to_hold_times: dict[str, float] = None,
+    continue_fire_when_hold: bool = False,
+    max_delay: float = 0.01,
+):
+    """The times at which a binding added with bind_hotkey_hold would have fired. The arguments are the same as for bind_hotkey_hold.
+
+    Returns:
+        numpy.ndarray: The times of the events that triggered the callback.
+    """
+    if not keys_to_hold_times:
+        keys_to_hold_times = {k: time_span for k in _keys_from_string(keys)}
+    evaluated = log.events_of(keys_to_hold_times)
+    now = log.times[evaluated]
+    states = [(log.key_state(k), v) for k, v in keys_to_hold_times.items()]
+    case1 = np.ones(len(now), dtype=bool)
+    case3 = np.ones(len(now), dtype=bool)
+    for (_, _, lsc), hold_time in states:
+        case1 &= now - lsc[evaluated] >= hold_time  # False while NaN
+        case3 &= ~np.isnan(lsc[evaluated])
+    case2 = _just_changed(now, [lsc[evaluated] for (_, _, lsc), _ in states])
+    case4 = _fresh(now, [lu[evaluated] for (_, lu, _), _ in states], max_delay)
+    met = case1 & case3 & case4
+    if continue_fire_when_hold:
+        return now[met]
+    # did_fire latch: it is reset by every evaluation where case1 is False and only the first
+    # candidate after a reset fires
+    candidates = met & ~case2
+    segments = np.cumsum(~case1)
+    _, first = np.unique(segments[candidates], return_index=True)
+    return now[candidates][first]
+
+
+def hotkey_multipress_fire_times(
+    log: EventLog,
+    keys: str,
+    time_span: float = 0.5,
+    presses: int = 3,
+    state: str = "down",
+    keys_to_multipress_times: dict[str, dict[str, typing.Any]] = None,
+    fire_when_hold: bool = False,
+    max_delay: float = 0.01,
+    history_length_factor: int = 10,
+):
+    """The times at which a binding added with bind_hotkey_multipress would have fired. The arguments are the same as for bind_hotkey_multipress.
+
+    Args:
+        history_length_factor (int, optional): Key.history_length_factor - the history of a key holds presses times this factor state changes. Defaults to 10.
+
+    Returns:
+        numpy.ndarray: The times of the events that triggered the callback.
+    """
+    if not keys_to_multipress_times:
+        keys_to_multipress_times = {
+            k: {"state": state, "time_span": time_span, "presses": presses}
+            for k in _keys_from_string(keys)
+        }
+    evaluated = log.events_of(keys_to_multipress_times)
+    now = log.times[evaluated]
+    positions = log.index[evaluated]
+    case1 = np.ones(len(now), dtype=bool)
+    case3 = np.ones(len(now), dtype=bool)
+    last_updates, last_state_changes = [], []
+    for name, v in keys_to_multipress_times.items():
+        key_state, last_update, last_state_change = log.key_state(name)
+        required = {"down": 1, "up": 0}.get(v["state"], -2)
+        case3 &= key_state[evaluated] == required
+        last_updates.append(last_update[evaluated])
+        last_state_changes.append(last_state_change[evaluated])
+        # the history of the key: its state changes, limited to the latest history_length ones
+        key_id = log.key_ids.get(name, -1)
+        change_positions = np.flatnonzero((log.keys == key_id) & log.changes)
+        change_times = log.times[change_positions]
+        matches = np.concatenate(
+            ([0], np.cumsum(log.downs[change_positions] == bool(required)))
+        )
+        in_history = np.searchsorted(change_positions, positions, side="right")
+        start = np.maximum(
+            np.searchsorted(change_times, now - v["time_span"], side="left"),
+            in_history - v["presses"] * history_length_factor,
+        )
+        start = np.minimum(start, in_history)
+        case1 &= matches[in_history] - matches[start] >= v["presses"]
+    case2 = _just_changed(now, last_state_changes) if not fire_when_hold else True
+    case4 = _fresh(now, last_updates, max_delay)
+    # did_fire latch: did = (case1 or did_before) and case2 and case3
+    latch = case2 & case3
+    index = np.arange(len(now))
+    last_case1 = np.maximum.accumulate(np.where(case1 & latch, index, -1))
+    last_break = np.maximum.accumulate(np.where(~latch, index, -1))
+    did_fire = latch & (last_case1 > last_break)
+    return now[did_fire & case4]
+
+
+_evaluators = {
+    "normal": hotkey_fire_times,
+    "hold": hotkey_hold_fire_times,
+    "multipress": hotkey_multipress_fire_times,
+}
+
+
+def evaluate_bindings(
+    log: EventLog, configurations: dict[typing.Hashable, dict[str, typing.Any]]
+) -> dict[typing.Hashable, dict[str, typing.Any]]:
+    """Evaluate several binding configurations over the same log.
+
+    Args:
+        log (EventLog): The recorded events.
+        configurations (dict): Name of the configuration to a dict with the "type" ("normal", "hold" or "multipress") and the keyword arguments of the matching bind function, e.g. {"type": "multipress", "keys": "shift", "presses": 2, "time_span": 0.3}.
+
+    Returns:
+        dict: Name of the configuration to a dict with the "count" of fires and their "times".
+    """
+    results = {}
+    for name, configuration in configurations.items():
+        configuration = dict(configuration)
+        evaluator = _evaluators[configuration.pop("type", "normal")]
+        times = evaluator(log, **configuration)
+        results[name] = {"count": len(times), "times": times}
+    return results
@@ -0,0 +1,178 @@
+import typing
+from collections.abc import Mapping
+from time import time
+from types import MappingProxyType
+
+_empty = MappingProxyType({})
+
+
+class LastChanges(Mapping):
+    """Immutable mapping of Key.index to the time of the last state change of the key, the last_changes of a KeyStateSnapshot.
+
+    A snapshot is published on every state change, copying all entries each time would cost O(keys) per event. `changed` returns a new mapping holding only the change and the mapping it was derived from instead. Once such a chain is longer than the entries of its base they are merged into a new base, so a change costs O(1) amortized. The entries of a mapping are merged by its first lookup and kept.
+
+    Args:
+        entries (typing.Mapping[int, float], optional): The initial entries. Defaults to None.
+    """
+
+    __slots__ = ("_index", "_time", "_parent", "_depth", "_limit", "_entries")
+
+    def __init__(self, entries: typing.Mapping[int, float] = None) -> None:
+        self._index = None
+        self._time = None
+        self._parent = None
+        self._depth = 0
+        "changes since the last base"
+        self._limit = max(len(entries) if entries else 0, 32)
+        "depth above which the chain is merged into a new base"
+        self._entries = dict(entries) if entries else {}
+        "all entries, None until merged - only set once, so readers on other threads see either None or the whole dict"
+
+    def changed(self, index: int, time: float) -> "LastChanges":
+        "A new mapping with the time of the key index set."
+        if self._depth >= self._limit:
+            entries = dict(self._merge())
+            entries[index] = time
+            return LastChanges(entries)
+        new = LastChanges.__new__(LastChanges)
+        new._index = index
+        new._time = time
+        new._parent = self
+        new._depth = self._depth + 1
+        new._limit = self._limit
+        new._entries = None
+        return new
+
+    def without(self, index: int) -> "LastChanges":
+        "A new mapping without the key index, it takes O(keys)."
+        entries = dict(self._merge())
+        entries.pop(index, None)
+        return LastChanges(entries)
+
+    def _merge(self) -> dict[int, float]:
+        entries = self._entries
+        if entries is None:
+            chain = []
+            node = self
+            while node._entries is None:
+                chain.append(node)
+                node = node._parent
+            entries = dict(node._entries)
+            for node in reversed(chain):
+                entries[node._index] = node._time
+            self._entries = entries
+        return entries
+
+    def __getitem__(self, index: int) -> float:
+        return self._merge()[index]
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._merge())
+
+    def __len__(self) -> int:
+        return len(self._merge())
+
+    def __repr__(self) -> str:
+        return f"LastChanges({self._merge()})"
+
+
+_no_changes = LastChanges()
+
+
+class KeyStateSnapshot:
+    """Immutable view of the key states of a KeyRegistry at one moment.
+
+    The thread processing the events publishes a new snapshot with a single reference swap whenever the state of a key changes, so readers on any thread get a consistent view without taking a lock. Repeats don't change the state and publish nothing.
+
+    Keys are looked up by name and is_keypad, is_keypad None means the main and the keypad key of that name, e.g. "enter" and "enter[kp]". Several keys may share a name and is_keypad (e.g. keys created from events with different scan codes), they count as one key which is down while any of them is.
+
+    Args:
+        pressed_mask (int): Bitset of the keys down, bit `key.index` belongs to `key`.
+        released_mask (int): Bitset of the keys up.
+        modifier_mask (int): The bits of pressed_mask belonging to modifiers (keyboard.is_modifier).
+        last_changes (LastChanges): Key.index to the time of the last state change of the key.
+        bits (typing.Mapping[tuple[str, bool], int]): (name, is_keypad) to the bits of the keys with that name.
+        time (float): The time of the state change that produced this snapshot.
+    """
+
+    __slots__ = (
+        "pressed_mask",
+        "released_mask",
+        "modifier_mask",
+        "last_changes",
+        "bits",
+        "time",
+    )
+
+    def __init__(
+        self,
+        pressed_mask: int = 0,
+        released_mask: int = 0,
+        modifier_mask: int = 0,
+        last_changes: LastChanges = _no_changes,
+        bits: typing.Mapping[tuple[str, bool], int] = _empty,
+        time: float = None,
+    ) -> None:
+        setattr_ = object.__setattr__
+        setattr_(self, "pressed_mask", pressed_mask)
+        setattr_(self, "released_mask", released_mask)
+        setattr_(self, "modifier_mask", modifier_mask)
+        setattr_(self, "last_changes", last_changes)
+        setattr_(self, "bits", bits)
+        setattr_(self, "time", time)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KeyStateSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("KeyStateSnapshot is immutable")
+
+    def mask(self, name: str, is_keypad: bool = None) -> int:
+        "The bits of the keys with the name, see the class docstring for is_keypad."
+        bits = self.bits
+        if is_keypad is None:
+            return bits.get((name, False), 0) | bits.get((name, True), 0)
+        return bits.get((name, bool(is_keypad)), 0)
+
+    def is_down(self, name: str, is_keypad: bool = None) -> bool:
+        "Whether the key was down."
+        return bool(self.pressed_mask & self.mask(name, is_keypad))
+
+    def is_up(self, name: str, is_keypad: bool = None) -> bool:
+        "Whether the key was up. False for keys without any event yet."
+        mask = self.mask(name, is_keypad)
+        return bool(self.released_mask & mask) and not self.pressed_mask & mask
+
+    def held_for(self, name: str, now: float = None, is_keypad: bool = None) -> float | None:
+        """How long the key has been held down.
+
+        Args:
+            name (str): The name of the key.
+            now (float, optional): The time to compare with. Defaults to None, which means the current time.
+            is_keypad (bool, optional): See the class docstring. Defaults to None.
+
+        Returns:
+            float | None: The time in seconds, None if the key was not down. The longest one if several keys with the name are down.
+        """
+        down = self.pressed_mask & self.mask(name, is_keypad)
+        if not down:
+            return None
+        last_changes = self.last_changes
+        since = float("inf")
+        while down:
+            bit = down & -down
+            since = min(since, last_changes[bit.bit_length() - 1])
+            down ^= bit
+        return (time() if now is None else now) - since
+
+    @property
+    def pressed(self) -> list[str]:
+        "The names of the keys down, keypad keys as in hotkey strings, e.g. \"enter[kp]\"."
+        return [
+            f"{name}[kp]" if is_keypad else name
+            for (name, is_keypad), bits in self.bits.items()
+            if self.pressed_mask & bits
+        ]
+
+    def __str__(self) -> str:
+        return f"KeyStateSnapshot object: pressed: {self.pressed}, time: {self.time}"
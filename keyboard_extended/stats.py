@@ -0,0 +1,126 @@
+import bisect
+
+
+class P2Quantile:
+    """Streaming estimate of a quantile using the P² algorithm (Jain & Chlamtac). It needs constant memory and time per value.
+
+    Args:
+        p (float): The quantile to estimate, between 0 and 1 - e.g. 0.99 for the 99th percentile.
+    """
+
+    def __init__(self, p: float) -> None:
+        if not 0 < p < 1:
+            raise ValueError("p must be between 0 and 1")
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        "Add a value to the estimate."
+        self.count += 1
+        q = self._heights
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+        n = self._positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float | None:
+        "The current estimate, None if there are no values yet."
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            return self._heights[min(self.count - 1, int(self.p * self.count))]
+        return self._heights[2]
+
+
+class LagStats:
+    """Streaming statistics of the delay between a keyboard event and its arrival at the hook.
+
+    The percentiles are estimated over windows of events, so they follow changes of the load. Until the current window has enough values the estimate of the previous window is used.
+
+    Args:
+        window (int, optional): The amount of events after which the percentile estimation starts over. Defaults to 10000.
+    """
+
+    def __init__(self, window: int = 10000) -> None:
+        self.window = window
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+        self._current = (P2Quantile(0.5), P2Quantile(0.99))
+        self._previous = None
+
+    def add(self, lag: float):
+        "Add the lag of an event in seconds."
+        self.count += 1
+        self.total += lag
+        self.last = lag
+        if lag > self.max:
+            self.max = lag
+        p50, p99 = self._current
+        p50.add(lag)
+        p99.add(lag)
+        if p99.count >= self.window:
+            self._previous = self._current
+            self._current = (P2Quantile(0.5), P2Quantile(0.99))
+
+    def _quantile(self, index: int) -> float | None:
+        current = self._current[index]
+        if current.count < 100 and self._previous is not None:
+            return self._previous[index].value
+        return current.value
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    @property
+    def p50(self) -> float | None:
+        return self._quantile(0)
+
+    @property
+    def p99(self) -> float | None:
+        return self._quantile(1)
+
+    def as_dict(self) -> dict[str, float | None]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "last": self.last,
+            "p50": self.p50,
+            "p99": self.p99,
+        }
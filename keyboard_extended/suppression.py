@@ -0,0 +1,97 @@
+import typing
+
+from keyboard import is_modifier
+
+
+class SuppressionState:
+    """The keys a suppressing hook has seen down, kept by the hook itself since the processing of the events may lag behind.
+
+    Only the keys of the decision table are tracked, as bits at their Key.index.
+    """
+
+    def __init__(self) -> None:
+        self.pressed_mask = 0
+        "Bitset of the tracked keys the hook has seen down."
+        self.suppressed_mask = 0
+        "Bitset of the triggers whose press was suppressed, their repeats and release are suppressed as well."
+        self.untracked_modifiers: set[str] = set()
+        "Names of the modifiers down which are not part of any suppressing binding - nothing is suppressed while they are held."
+
+
+class SuppressionTable:
+    """Immutable decision table of a KeyRegistry answering in O(1) whether the hook suppresses an event.
+
+    A suppressing binding is triggered by the last key of its hotkey string, the other keys are its modifiers. A press is suppressed if the pressed tracked keys other than the trigger are exactly the modifiers of a suppressing binding of the trigger and no other modifier (keyboard.is_modifier) is held. The repeats and the release of a suppressed press are suppressed as well, those of a press that passed always pass - suppression only starts on a real press, so no application sees a key down without its release. No callback is evaluated to decide, the bindings are checked later as usual. The events aren't told apart by device, so bind_hotkey doesn't accept a device for suppressing bindings.
+
+    Args:
+        bindings (typing.Iterable[Binding], optional): The suppressing bindings. Defaults to ().
+    """
+
+    def __init__(self, bindings: typing.Iterable = ()) -> None:
+        bits_by_name: dict[tuple[str, typing.Any], int] = {}
+        bits_by_scan_code: dict[tuple[int, typing.Any], int] = {}
+        triggers: set[tuple[int, int]] = set()
+        modifier_mask = 0
+        for binding in bindings:
+            keys = binding.keys
+            trigger = keys[-1]
+            modifiers = 0
+            for key in keys:
+                bits_by_name[(key.name, key.is_keypad)] = key.bit
+                scan_codes = key.scan_code if isinstance(key.scan_code, tuple) else (key.scan_code,)
+                for scan_code in scan_codes:
+                    bits_by_scan_code[(scan_code, key.is_keypad)] = key.bit
+                if key is not trigger:
+                    modifiers |= key.bit
+            triggers.add((trigger.bit, modifiers))
+            modifier_mask |= modifiers
+        self.bits_by_name = bits_by_name
+        "(name, is_keypad) of the tracked keys to their bit"
+        self.bits_by_scan_code = bits_by_scan_code
+        "(scan code, is_keypad) of the tracked keys to their bit"
+        self.triggers = frozenset(triggers)
+        "(bit of the trigger, bitset of its modifiers) of every suppressing binding"
+        self.modifier_mask = modifier_mask
+        "Bitset of all keys which are modifiers of a suppressing binding."
+
+    def __bool__(self) -> bool:
+        return bool(self.triggers)
+
+    def decide(self, event, state: SuppressionState) -> bool:
+        """Update the state with the event and decide whether it is suppressed.
+
+        Args:
+            event (KeyboardEvent): The event received by the hook.
+            state (SuppressionState): The state of the hook.
+
+        Returns:
+            bool: True if the event is suppressed.
+        """
+        bit = self.bits_by_name.get((event.name, event.is_keypad)) or self.bits_by_scan_code.get(
+            (event.scan_code, event.is_keypad)
+        )
+        if bit is None:
+            if is_modifier(event.name):
+                if event.event_type == "down":
+                    state.untracked_modifiers.add(event.name)
+                else:
+                    state.untracked_modifiers.discard(event.name)
+            return False
+        if event.event_type == "down":
+            if state.suppressed_mask & bit:
+                return True
+            repeat = state.pressed_mask & bit
+            state.pressed_mask |= bit
+            if repeat:  # the press passed, so its repeats and release have to pass as well
+                return False
+            if (
+                bit, state.pressed_mask & self.modifier_mask & ~bit
+            ) in self.triggers and not state.untracked_modifiers:
+                state.suppressed_mask |= bit
+                return True
+            return False
+        state.pressed_mask &= ~bit
+        if state.suppressed_mask & bit:
+            state.suppressed_mask &= ~bit
+            return True
+        return False
@@ -0,0 +1,113 @@
+import typing
+from collections import deque
+
+
+class TraceRecord:
+    """What the listener did with a single keyboard event.
+
+    Args:
+        event (KeyboardEvent): The event received by the hook.
+        key (Key): The key the event was resolved to.
+        bindings (list[tuple[int, bool, str | None]]): Every evaluated binding as tuple of its id, whether it fired and the name of the condition that failed (see Binding.failed_condition).
+        resolve_time (float): Seconds spent resolving the key and updating its state.
+        evaluation_time (float): Seconds spent evaluating the bindings, including the callbacks that fired.
+    """
+
+    def __init__(
+        self,
+        event,
+        key,
+        bindings: list[tuple[int, bool, typing.Optional[str]]],
+        resolve_time: float,
+        evaluation_time: float,
+    ) -> None:
+        self.event = event
+        self.key = key
+        self.bindings = bindings
+        self.resolve_time = resolve_time
+        self.evaluation_time = evaluation_time
+
+    def __str__(self) -> str:
+        return f'TraceRecord object: key: "{self.key.name}", event_type: "{self.event.event_type}", bindings: {self.bindings}, resolve_time: {self.resolve_time}, evaluation_time: {self.evaluation_time}'
+
+
+class Tracer:
+    """Pass sampled TraceRecords of the hook to an observer.
+
+    Args:
+        observer (typing.Callable): Called with a TraceRecord for every sampled event. It runs on the hook thread, so it should be fast - e.g. a RingBufferSink.
+        sample_rate (float, optional): Share of the events to trace, between 0 and 1. The events are sampled evenly, with a rate of 0.01 every 100th event is traced. Defaults to 1.
+    """
+
+    def __init__(self, observer: typing.Callable, sample_rate: float = 1) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.observer = observer
+        self.sample_rate = sample_rate
+        self._credit = 0.0
+
+    def should_sample(self) -> bool:
+        "Whether the current event is traced."
+        self._credit += self.sample_rate
+        if self._credit >= 1:
+            self._credit -= 1
+            return True
+        return False
+
+
+class RingBufferSink:
+    """Observer for a Tracer which keeps the latest records only.
+
+    Args:
+        size (int, optional): The amount of records kept. Defaults to 1000.
+    """
+
+    def __init__(self, size: int = 1000) -> None:
+        self.records: deque[TraceRecord] = deque(maxlen=size)
+
+    def __call__(self, record: TraceRecord):
+        self.records.append(record)
+
+    def __iter__(self):
+        return iter(list(self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def failures(self, binding_id: int) -> list[tuple[TraceRecord, str]]:
+        """Get the kept records in which the binding was evaluated but didn't fire.
+
+        Args:
+            binding_id (int): The id returned when adding the binding.
+
+        Returns:
+            list[tuple[TraceRecord, str]]: The records with the name of the condition that failed.
+        """
+        failures = []
+        for record in self:
+            for _id, fired, failed_condition in record.bindings:
+                if _id == binding_id and not fired:
+                    failures.append((record, failed_condition))
+        return failures
+
+
+class HookProfiler:
+    """Enable a profiler only while the hook processes an event, so the profile contains nothing but the hook path.
+
+    Args:
+        profiler: A profiler with enable and disable methods like cProfile.Profile, or with start and stop methods like pyinstrument.Profiler.
+    """
+
+    def __init__(self, profiler) -> None:
+        self.profiler = profiler
+        if hasattr(profiler, "enable") and hasattr(profiler, "disable"):
+            self._start, self._stop = profiler.enable, profiler.disable
+        else:
+            self._start, self._stop = profiler.start, profiler.stop
+
+    def __enter__(self):
+        self._start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop()
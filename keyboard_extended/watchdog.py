@@ -0,0 +1,146 @@
+import queue
+import threading
+import traceback
+import typing
+from time import perf_counter, time
+
+
+class CallbackStats:
+    "Runtime statistics of the callback of a single binding."
+
+    __slots__ = ("count", "total", "max", "overruns", "last_overrun", "last_overrun_time")
+
+    def __init__(self) -> None:
+        self.count = 0
+        "The amount of calls."
+        self.total = 0.0
+        "The summed runtime in seconds."
+        self.max = 0.0
+        "The longest runtime in seconds."
+        self.overruns = 0
+        "The amount of calls over the budget."
+        self.last_overrun: float = None
+        "The runtime of the latest call over the budget."
+        self.last_overrun_time: float = None
+        "When the latest call over the budget happened, comparable with time.time()."
+
+    @property
+    def mean(self) -> float | None:
+        "The mean runtime in seconds, None if there was no call yet."
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "overruns": self.overruns,
+            "last_overrun": self.last_overrun,
+            "last_overrun_time": self.last_overrun_time,
+        }
+
+    def __str__(self) -> str:
+        return f"CallbackStats object: count: {self.count}, mean: {self.mean}, max: {self.max}, overruns: {self.overruns}, last_overrun: {self.last_overrun}"
+
+
+class CallbackWatchdog:
+    """Measure the runtime of the callbacks of the bindings and flag those over a budget. Pass it to `KeyboardListener(watchdog=...)`.
+
+    Callbacks run on the thread handling the events, so a slow one delays every following event - with a non threaded listener even the keyboard path of the OS. With offload=True a binding whose callback overran the budget is called on a worker thread from then on, the events are handled without waiting for it. The offloaded callbacks run one after another in the order they fired.
+
+    Args:
+        budget (float, optional): The runtime in seconds a callback may take. Defaults to 0.005.
+        offload (bool, optional): Call the callbacks of bindings which overran the budget on a worker thread. Defaults to False.
+        on_overrun (typing.Callable, optional): Called with the binding and the runtime for every call over the budget, on the thread the callback ran on. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.005,
+        offload: bool = False,
+        on_overrun: typing.Callable = None,
+    ) -> None:
+        self.budget = budget
+        self.offload = offload
+        self.on_overrun = on_overrun
+        self.stats: dict[int, CallbackStats] = {}
+        "binding id to the statistics of its callback"
+        self.flagged: set[int] = set()
+        "The ids of the bindings whose callback overran the budget at least once."
+        self.offloaded: set[int] = set()
+        "The ids of the bindings called on the worker thread."
+        self._lock = threading.Lock()
+        "Guards the statistics, which are written by the event thread and the worker."
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker: threading.Thread = None
+
+    def call(self, binding, args: typing.Iterable, kwargs: dict):
+        "Call the callback of the binding with the arguments, measured or offloaded."
+        if binding.id in self.offloaded:
+            self._submit(binding, args, kwargs)
+            return
+        start = perf_counter()
+        try:
+            binding.callback(*args, **kwargs)
+        finally:
+            self._record(binding, perf_counter() - start)
+
+    def _record(self, binding, runtime: float):
+        overrun = runtime > self.budget
+        with self._lock:
+            stats = self.stats.get(binding.id)
+            if stats is None:
+                stats = self.stats[binding.id] = CallbackStats()
+            stats.count += 1
+            stats.total += runtime
+            if runtime > stats.max:
+                stats.max = runtime
+            if overrun:
+                stats.overruns += 1
+                stats.last_overrun = runtime
+                stats.last_overrun_time = time()
+                self.flagged.add(binding.id)
+                if self.offload:
+                    self.offloaded.add(binding.id)
+        if overrun and self.on_overrun is not None:
+            self.on_overrun(binding, runtime)
+
+    def _submit(self, binding, args: typing.Iterable, kwargs: dict):
+        self._queue.put((binding, args, kwargs))
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._work,
+                        name="keyboard_extended offloaded callbacks",
+                        daemon=True,
+                    )
+                    self._worker.start()
+
+    def _work(self):
+        while True:
+            binding, args, kwargs = self._queue.get()
+            start = perf_counter()
+            try:
+                binding.callback(*args, **kwargs)
+            except Exception:
+                traceback.print_exc()
+            self._record(binding, perf_counter() - start)
+
+    def restore(self, binding_id: int):
+        "Call the callback of the binding on the event thread again, e.g. after the plugin was fixed."
+        with self._lock:
+            self.offloaded.discard(binding_id)
+            self.flagged.discard(binding_id)
+
+    def forget(self, binding_id: int):
+        "Drop everything known about a binding, called when it is removed."
+        with self._lock:
+            self.stats.pop(binding_id, None)
+            self.offloaded.discard(binding_id)
+            self.flagged.discard(binding_id)
+
+    def report(self) -> dict[int, dict]:
+        "The statistics of all bindings as dicts, see CallbackStats.as_dict."
+        with self._lock:
+            return {i: s.as_dict() for i, s in self.stats.items()}
@@ -37,6 +37,7 @@ setup(
     long_description=long_description,
     packages=find_packages(),
     install_requires=["keyboard"],
+    extras_require={"offline": ["numpy"]},
     keywords=["python"],
     classifiers=[
         "Development Status :: 1 - Planning",
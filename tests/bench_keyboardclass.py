@@ -0,0 +1,82 @@
+"""Microbenchmark of the legacy KeyboardClass hook callback: 100k down/up events through keyboard_hook_callback, best of 5 runs. Key "a" has two callbacks, one with send_self and args, "b" has none and "strg" is a German alias updating strg and ctrl.
+
+    python tests/bench_keyboardclass.py
+    python tests/bench_keyboardclass.py --before <revision>
+
+--before also runs the KeyboardClass.py of a git revision, e.g. the parent of a commit changing it (git log -- keyboard_extended/KeyboardClass.py), so both are measured in the same process. No hook is installed, the events are passed to the callback directly.
+"""
+
+import argparse
+import importlib.util
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+
+from keyboard import KeyboardEvent
+
+import keyboard_extended
+import keyboard_extended.KeyboardClass
+
+EVENTS = 100000
+keys = ("a", "b", "strg")
+
+
+def load_revision(revision: str):
+    "Import the KeyboardClass.py of a git revision as a module of keyboard_extended, so its relative imports resolve."
+    root = Path(__file__).resolve().parent.parent
+    source = subprocess.run(
+        ["git", "show", f"{revision}:keyboard_extended/KeyboardClass.py"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    name = "keyboard_extended._KeyboardClass_before"
+    spec = importlib.util.spec_from_loader(name, loader=None)
+    module = importlib.util.module_from_spec(spec)
+    module.__package__ = "keyboard_extended"
+    sys.modules[name] = module
+    exec(compile(source, f"{revision}:keyboard_extended/KeyboardClass.py", "exec"), module.__dict__)
+    return module
+
+
+def bench(module) -> tuple[dict[str, float], int]:
+    """Measure the callback of a KeyboardClass module.
+
+    Returns:
+        tuple[dict[str, float], int]: Key name to microseconds per event, and the amount of callbacks called.
+    """
+    module.time = lambda: 0.0
+    hits = [0]
+
+    def callback(*args):
+        hits[0] += 1
+
+    module.get_Key("a").bind(callback, args=[1, 2], send_self=True)
+    module.get_Key("a").bind(callback)
+    hook = module.keyboard_hook_callback
+    results = {}
+    for name in keys:
+        events = [KeyboardEvent(t, 1, name, 0.0) for t in ("down", "up")] * (EVENTS // 2)
+        best = min(timeit.repeat(lambda: [hook(e) for e in events], number=1, repeat=5))
+        results[name] = best / len(events) * 1e6
+    return results, hits[0]
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--before", help="git revision to compare with")
+    args = parser.parse_args(argv)
+    columns = {}
+    if args.before:
+        columns[args.before] = bench(load_revision(args.before))
+    columns["current"] = bench(keyboard_extended.KeyboardClass)
+    print("key    " + "".join(f"{c:>14s}" for c in columns))
+    for name in keys:
+        print(f"{name:7s}" + "".join(f"{r[name]:11.2f} us" for r, _ in columns.values()))
+    print("callbacks" + "".join(f"{hits:>14d}" for _, hits in columns.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+from time import time
+
+import pytest
+from keyboard import key_to_scan_codes
+
+from keyboard_extended import AdmissionControl, KeyboardListener, KeyRegistry
+from keyboard_extended.admission import ADMIT, DROP, STATE_ONLY
+from keyboard_extended.backends import MemoryBackend
+
+
+def _event(name: str, event_type: str = "down", _time: float = None):
+    return MemoryBackend.make_event(name, event_type, key_to_scan_codes(name)[0], _time)
+
+
+def _listener(admission: AdmissionControl) -> KeyboardListener:
+    return KeyboardListener(registry=KeyRegistry(), backend=MemoryBackend(), admission=admission)
+
+
+def test_fresh_events_are_admitted():
+    admission = AdmissionControl()
+    _listener(admission)
+    assert admission.admit(_event("a"), 0.0) is ADMIT
+    assert admission.as_dict() == {
+        "admitted": 1,
+        "stale": 0,
+        "injected_dropped": 0,
+        "injected_state_only": 0,
+        "shed_dropped": 0,
+        "shed_state_only": 0,
+    }
+
+
+def test_stale_after_the_largest_max_delay():
+    admission = AdmissionControl()
+    listener = _listener(admission)
+    assert admission.admit(_event("a"), 10.0) is ADMIT  # without bindings nothing is stale
+    listener.bind_hotkey("ctrl+k", lambda: None, max_delay=0.05)
+    listener.bind_hotkey("a", lambda: None, max_delay=0.02)
+    assert admission.admit(_event("a"), 0.04) is ADMIT
+    assert admission.admit(_event("a"), 0.05) is STATE_ONLY
+    assert admission.stale == 1 and admission.dropped == 1
+
+
+def test_stale_after_given():
+    admission = AdmissionControl(stale_after=0.5)
+    _listener(admission).bind_hotkey("a", lambda: None, max_delay=5)
+    assert admission.admit(_event("a"), 0.4) is ADMIT
+    assert admission.admit(_event("a"), 0.6) is STATE_ONLY
+
+
+def test_removed_bindings_update_the_max_delay():
+    admission = AdmissionControl()
+    listener = _listener(admission)
+    hotkey_id = listener.bind_hotkey("a", lambda: None, max_delay=1.0)
+    listener.bind_hotkey("b", lambda: None, max_delay=0.1)
+    assert admission.admit(_event("a"), 0.5) is ADMIT
+    listener.remove_binding(hotkey_id)
+    assert admission.admit(_event("a"), 0.5) is STATE_ONLY
+
+
+def test_injection_window():
+    admission = AdmissionControl(injection_grace=0.0)
+    _listener(admission)
+    with admission.injecting([(key_to_scan_codes("a")[0], "down")]):
+        assert admission.admit(_event("a"), 0.0) is DROP
+        assert admission.admit(_event("a"), 0.0) is STATE_ONLY  # the tag is used up
+        assert admission.admit(_event("ctrl"), 0.0) is STATE_ONLY
+        inside = time()
+    assert admission.admit(_event("ctrl", "up", inside), 0.0) is STATE_ONLY  # happened in the window
+    assert admission.admit(_event("ctrl", "up", time() + 1), 0.0) is ADMIT
+    assert admission.injected_dropped == 1 and admission.injected_state_only == 3
+
+
+def test_window_without_tags_drops_nothing():
+    admission = AdmissionControl()
+    _listener(admission)
+    with admission.injecting():
+        assert admission.admit(_event("a"), 0.0) is STATE_ONLY
+    assert admission.injected_dropped == 0
+
+
+def test_untagged_keys_in_the_window_update_the_state_only():
+    "A modifier pressed in the window stays tracked, so it is released as well and nothing fires with it later."
+    fired = []
+    admission = AdmissionControl()
+    listener = _listener(admission)
+    listener.bind_hotkey("ctrl+c", lambda: fired.append(1), max_delay=60)
+    push = listener.backend.push
+    with admission.injecting([(key_to_scan_codes("c")[0], "down"), (key_to_scan_codes("c")[0], "up")]):
+        push(_event("ctrl"))
+        push(_event("c"))
+        assert listener.registry.keys["ctrl"].state == "down"
+        assert listener.registry.keys["c"].state is None  # dropped
+        push(_event("c", "up"))
+        push(_event("ctrl", "up"))
+    assert listener.registry.keys["ctrl"].state == "up"
+    assert fired == []
+
+
+def test_shed_unbound_keys():
+    admission = AdmissionControl(max_backlog=10)
+    _listener(admission).bind_hotkey("ctrl+k", lambda: None, max_delay=60)
+    assert admission.admit(_event("a"), 0.0, backlog=10) is ADMIT
+    assert admission.admit(_event("a"), 0.0, backlog=11) is STATE_ONLY
+    assert admission.admit(_event("k"), 0.0, backlog=11) is ADMIT
+    assert admission.shed_state_only == 1
+
+
+def test_shed_repeats():
+    admission = AdmissionControl(max_backlog=10, shed_policy="repeats")
+    listener = _listener(admission)
+    get_key = listener._get_user_key_from_event
+    listener.backend.push(_event("a"))
+    assert admission.admit(_event("a"), 0.0, 11, get_key) is DROP
+    assert admission.admit(_event("a", "up"), 0.0, 11, get_key) is ADMIT
+    assert admission.admit(_event("a"), 0.0, 11) is ADMIT  # no key, no repeats
+    assert admission.admit(_event("a"), 0.0, 10, get_key) is ADMIT
+    assert admission.shed_dropped == 1
+
+
+def test_unknown_shed_policy():
+    with pytest.raises(ValueError):
+        AdmissionControl(shed_policy="state_only")
@@ -0,0 +1,34 @@
+from keyboard_extended import KeyboardListener, KeyRegistry
+from keyboard_extended.backends import MemoryBackend
+
+
+def test_make_events():
+    events = MemoryBackend.make_events(["a", "b"], 6, _time=1.0)
+    assert [(e.event_type, e.name) for e in events] == [
+        ("down", "a"),
+        ("up", "a"),
+        ("down", "b"),
+        ("up", "b"),
+        ("down", "a"),
+        ("up", "a"),
+    ]
+    assert {e.scan_code for e in events} == {MemoryBackend.synthetic_scan_codes, MemoryBackend.synthetic_scan_codes + 1}
+    assert all(e.time == 1.0 and e.is_keypad is False for e in events)
+
+
+def test_synthetic_scan_codes_match_no_real_key():
+    "esc has scan code 1, the first synthetic key must not resolve to it."
+    fired = []
+    backend = MemoryBackend()
+    listener = KeyboardListener(registry=KeyRegistry(), backend=backend)
+    listener.bind_hotkey("esc", lambda: fired.append("esc"), max_delay=60)
+    listener.bind_hotkey("a", lambda: fired.append("a"), max_delay=60)
+    backend.push_many(MemoryBackend.make_events(["b", "a"], 4))
+    listener.stop_keyboard_hook()
+    assert fired == ["a"]
+
+
+def test_push_without_listener():
+    backend = MemoryBackend()
+    assert backend.push(MemoryBackend.make_event("a")) is True
+    assert backend.push_many(MemoryBackend.make_events("a", 2)) == 0
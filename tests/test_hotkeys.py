@@ -0,0 +1,101 @@
+import pytest
+
+from keyboard_extended.hotkeys import ChordSpec, HotkeySyntaxError, KeySpec, parse_chord, parse_hotkey
+
+
+def _names(text: str) -> list[list[str]]:
+    return [chord.names for chord in parse_hotkey(text).chords]
+
+
+@pytest.mark.parametrize(
+    "text, names",
+    [
+        ("ctrl+shift+a", [["ctrl", "shift", "a"]]),
+        (" ctrl + left ctrl ", [["ctrl", "left ctrl"]]),
+        ("+", [["+"]]),
+        ("ctrl++", [["ctrl", "+"]]),
+        ("ctrl+,", [["ctrl", ","]]),
+        ("ctrl+*", [["ctrl", "*"]]),
+        ("ctrl+]", [["ctrl", "]"]]),
+        ("]", [["]"]]),
+        ("@", [["@"]]),
+        ("keypad *", [["keypad *"]]),
+        ("ctrl+keypad *", [["ctrl", "keypad *"]]),
+        ("a\\+b", [["a+b"]]),
+        ("ctrl+\\,", [["ctrl", ","]]),
+        ("\\ ", [[" "]]),
+    ],
+)
+def test_names(text, names):
+    assert _names(text) == names
+
+
+def test_sequences():
+    spec = parse_hotkey("a, b ,ctrl+c")
+    assert spec.is_sequence
+    assert [chord.names for chord in spec.chords] == [["a"], ["b"], ["ctrl", "c"]]
+    assert not parse_hotkey("a").is_sequence
+
+
+@pytest.mark.parametrize(
+    "text, chord",
+    [
+        ("k*3@0.5s", ChordSpec((KeySpec("k"),), "multipress", 3, 0.5)),
+        ("k*2", ChordSpec((KeySpec("k"),), "multipress", 2, None)),
+        ("ctrl+k * 3 @ 500ms", ChordSpec((KeySpec("ctrl"), KeySpec("k")), "multipress", 3, 0.5)),
+        ("k~300ms", ChordSpec((KeySpec("k"),), "hold", None, 0.3)),
+        ("k~1.5s", ChordSpec((KeySpec("k"),), "hold", None, 1.5)),
+        ("k~2", ChordSpec((KeySpec("k"),), "hold", None, 2.0)),
+        ("keypad **3", ChordSpec((KeySpec("keypad *"),), "multipress", 3, None)),
+    ],
+)
+def test_modifiers(text, chord):
+    assert parse_hotkey(text).chords == (chord,)
+
+
+@pytest.mark.parametrize(
+    "text, key",
+    [
+        ("a[kp]", KeySpec("a", True)),
+        ("a[keypad]", KeySpec("a", True)),
+        ("a[dev=x]", KeySpec("a", None, "x")),
+        ("a[kp,dev=x]", KeySpec("a", True, "x")),
+        ("a[ kp ][device = kbd 1]", KeySpec("a", True, "kbd 1")),
+    ],
+)
+def test_qualifiers(text, key):
+    assert parse_hotkey(text).chords[0].keys == (key,)
+
+
+@pytest.mark.parametrize(
+    "text, position",
+    [
+        ("", 0),
+        ("a+", 2),
+        ("a,,b", 3),
+        ("k*3+b", 3),
+        ("k*0", 3),
+        ("k*3@", 4),
+        ("a[foo]", 6),
+        ("a[dev=]", 7),
+        ("a[kp", 2),
+        ("a\\", 1),
+    ],
+)
+def test_errors(text, position):
+    with pytest.raises(HotkeySyntaxError) as error:
+        parse_hotkey(text)
+    assert error.value.position == position
+    assert isinstance(error.value, ValueError)
+
+
+def test_results_are_cached():
+    assert parse_hotkey("ctrl+k") is parse_hotkey("ctrl+k")
+
+
+def test_parse_chord():
+    assert parse_chord("ctrl+k~1s", ("hold",)).kind == "hold"
+    with pytest.raises(ValueError):
+        parse_chord("a, b")
+    with pytest.raises(ValueError):
+        parse_chord("k*3", ("normal",))
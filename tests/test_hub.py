@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+from keyboard_extended.backends import MemoryBackend
+
+if sys.platform == "win32":
+    pytest.skip("the hub needs Unix domain sockets", allow_module_level=True)
+
+from keyboard_extended.hub import HubBackend, KeyboardHub
+
+
+@pytest.fixture
+def hub():
+    backend = MemoryBackend()
+    hub = KeyboardHub(os.path.join(tempfile.mkdtemp(), "hub.sock"), backend=backend)
+    hub.start()
+    yield hub
+    hub.stop()
+
+
+def _connect(hub: KeyboardHub) -> tuple[HubBackend, list]:
+    received = []
+    client = HubBackend(hub.path)
+    client.start(received.append)
+    deadline = time.time() + 5
+    while not hub.clients and time.time() < deadline:
+        time.sleep(0.001)
+    return client, received
+
+
+def _wait(received: list, amount: int):
+    deadline = time.time() + 5
+    while len(received) < amount and time.time() < deadline:
+        time.sleep(0.001)
+
+
+def _push(hub: KeyboardHub, *events):
+    for event in events:
+        hub.backend.push(event)
+
+
+def test_events_arrive(hub):
+    client, received = _connect(hub)
+    _push(
+        hub,
+        MemoryBackend.make_event("a", "down", 30, 1.5, device="kbd1", is_keypad=True),
+        MemoryBackend.make_event("a", "up", 30, 1.6),
+    )
+    _wait(received, 2)
+    client.stop()
+    assert [(e.event_type, e.scan_code, e.name, e.time, e.device, e.is_keypad) for e in received] == [
+        ("down", 30, "a", 1.5, "kbd1", True),
+        ("up", 30, "a", 1.6, None, False),
+    ]
+
+
+def test_full_string_table_starts_over(hub):
+    hub.max_strings = 3
+    hub.max_batch = 1  # a batch never needs more strings than the table holds
+    client, received = _connect(hub)
+    names = [f"key{i}" for i in range(10)]
+    _push(hub, *(MemoryBackend.make_event(name, "down", i) for i, name in enumerate(names)))
+    _wait(received, len(names))
+    late, late_received = _connect(hub)  # gets the current table only
+    _push(hub, MemoryBackend.make_event("key9", "up", 9), MemoryBackend.make_event("key0", "up", 0))
+    _wait(late_received, 2)
+    _wait(received, len(names) + 2)
+    client.stop()
+    late.stop()
+    assert [e.name for e in received] == names + ["key9", "key0"]
+    assert [e.name for e in late_received] == ["key9", "key0"]
+    assert len(hub._strings) <= hub.max_strings
+
+
+def test_sender_survives_a_bad_event(hub, capsys):
+    hub.max_batch = 1  # the batch of the bad event is lost
+    client, received = _connect(hub)
+    _push(hub, MemoryBackend.make_event("a", "down", 2**40), MemoryBackend.make_event("b", "down", 48))
+    _wait(received, 1)
+    client.stop()
+    assert [e.name for e in received] == ["b"]
+    assert "error" in capsys.readouterr().err
+    assert hub.published == 1
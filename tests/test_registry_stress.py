@@ -0,0 +1,125 @@
+"""Stress test of a KeyRegistry: many threads bind and unbind hotkeys while a high-rate stream of synthetic events is processed.
+
+Run with pytest or as a script: python tests/test_registry_stress.py
+"""
+
+import random
+import threading
+import time
+
+import pytest
+from keyboard import key_to_scan_codes
+
+from keyboard_extended import KeyboardListener, KeyRegistry
+from keyboard_extended.backends import MemoryBackend
+
+WRITERS = 8
+CHORDS = 3000
+"Presses of the bound hotkey in the stream."
+NOISE = 400
+"Distinct unknown keys in the stream, more than max_event_keys so the hook thread keeps creating and evicting keys."
+churn_hotkeys = ("a", "b", "c", "ctrl+a", "shift+b", "c[kp]", "ctrl+k", "k[dev=kbd1]")
+
+
+def _event(name: str, event_type: str, scan_code: int = None, device=None):
+    if scan_code is None:
+        scan_code = key_to_scan_codes(name)[0]
+    return MemoryBackend.make_event(name, event_type, scan_code, device=device)
+
+
+def _stream(seed: int) -> list:
+    rng = random.Random(seed)
+    events = []
+    for i in range(CHORDS):
+        events += [_event("ctrl", "down"), _event("k", "down", device=rng.choice((None, "kbd1")))]
+        for _ in range(rng.randint(0, 3)):
+            noise = rng.randrange(NOISE)
+            events += [_event(f"noise{noise}", "down", 1000 + noise), _event(f"noise{noise}", "up", 1000 + noise)]
+        for name in rng.sample(("a", "b", "c", "shift"), 2):
+            events += [_event(name, "down"), _event(name, "up")]
+        events += [_event("k", "up"), _event("ctrl", "up")]
+    return events
+
+
+def _churn(listener: KeyboardListener, seed: int, done: threading.Event, errors: list):
+    rng = random.Random(seed)
+    bound = []
+    try:
+        while not done.is_set():
+            time.sleep(0)  # let the thread pushing the events run, 8 writers in a tight loop starve it of the GIL
+            action = rng.random()
+            if action < 0.4 or not bound:
+                hotkey = rng.choice(churn_hotkeys)
+                kind = rng.randrange(3)
+                if kind == 0:
+                    bound.append(listener.bind_hotkey(hotkey, lambda: None, device=rng.choice((None, "kbd2"))))
+                elif kind == 1:
+                    bound.append(listener.bind_hotkey_hold(hotkey, lambda: None, time_span=0.05))
+                else:
+                    bound.append(listener.bind_hotkey_multipress(hotkey, lambda: None, presses=rng.randint(2, 4)))
+            elif action < 0.9:
+                listener.remove_binding(bound.pop(rng.randrange(len(bound))))
+            else:
+                with listener.registry.batch():
+                    for _ in range(rng.randint(1, 10)):
+                        bound.append(listener.bind_hotkey(rng.choice(churn_hotkeys), lambda: None))
+                    while len(bound) > 5:
+                        listener.remove_binding(bound.pop())
+        for hotkey_id in bound:
+            listener.remove_binding(hotkey_id)
+    except Exception as e:
+        errors.append(e)
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_bind_and_unbind_during_stream(threaded: bool):
+    registry = KeyRegistry(max_event_keys=64, key_idle_time=0)
+    backend = MemoryBackend()
+    listener = KeyboardListener(registry=registry, backend=backend, threaded=threaded)
+    errors = []
+    handle_event = listener._handle_event
+
+    def checked_handle_event(event):  # the processing thread only prints exceptions
+        try:
+            handle_event(event)
+        except Exception as e:
+            errors.append(e)
+            raise
+
+    listener._handle_event = checked_handle_event
+    fires = []
+    # fire_when_hold and the large max_delay make the fires independent of the 0.1 s rounding of the press times and of the load
+    stable = listener.bind_hotkey("ctrl+k", lambda: fires.append(1), fire_when_hold=True, max_delay=60)
+    events = _stream(0)
+    done = threading.Event()
+    writers = [
+        threading.Thread(target=_churn, args=(listener, seed, done, errors)) for seed in range(WRITERS)
+    ]
+    for writer in writers:
+        writer.start()
+    try:
+        backend.push_many(events)
+        deadline = time.time() + 60
+        while len(fires) < CHORDS and time.time() < deadline:  # the writers go on while a threaded listener catches up
+            time.sleep(0.01)
+    finally:
+        done.set()
+        for writer in writers:
+            writer.join()
+        listener.stop_keyboard_hook()
+    assert not errors
+    assert len(fires) == CHORDS
+    assert list(registry.bindings) == [stable]
+    for _, _, _, key in registry.user_keys:
+        for k in (key, *key.device_keys.values()):
+            published = {b.id for bucket in k._buckets.values() for b in bucket}
+            assert published <= {stable}
+            assert set(k.bindings) <= {stable}
+    assert len(registry.event_keys) <= registry.max_event_keys
+    assert registry.evictions
+
+
+if __name__ == "__main__":
+    for threaded in (False, True):
+        test_bind_and_unbind_during_stream(threaded)
+    print("ok")
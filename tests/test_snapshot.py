@@ -0,0 +1,117 @@
+import pytest
+from keyboard import key_to_scan_codes
+
+from keyboard_extended import KeyboardListener, KeyRegistry
+from keyboard_extended.backends import MemoryBackend
+from keyboard_extended.snapshot import KeyStateSnapshot, LastChanges
+
+
+def _event(name: str, event_type: str, _time: float, is_keypad: bool = False):
+    return MemoryBackend.make_event(name, event_type, key_to_scan_codes(name)[0], _time, is_keypad=is_keypad)
+
+
+@pytest.fixture
+def listener():
+    listener = KeyboardListener(registry=KeyRegistry(), backend=MemoryBackend())
+    yield listener
+    listener.stop_keyboard_hook()
+
+
+def test_is_down_held_for_and_last_changes(listener):
+    listener.backend.push(_event("shift", "down", 10.0))
+    snapshot = listener.snapshot()
+    assert snapshot.is_down("shift") and not snapshot.is_up("shift")
+    assert snapshot.held_for("shift", now=12.5) == 2.5
+    assert snapshot.pressed == ["shift"]
+    assert snapshot.time == 10.0
+    assert list(snapshot.last_changes.values()) == [10.0]
+    listener.backend.push(_event("shift", "up", 11.0))
+    assert snapshot.is_down("shift")  # a snapshot never changes
+    snapshot = listener.snapshot()
+    assert snapshot.is_up("shift") and not snapshot.is_down("shift")
+    assert snapshot.held_for("shift") is None
+    assert snapshot.pressed == []
+
+
+def test_unknown_keys(listener):
+    snapshot = listener.snapshot()
+    assert not snapshot.is_down("ctrl") and not snapshot.is_up("ctrl")
+    assert snapshot.held_for("ctrl") is None
+
+
+def test_repeats_publish_nothing(listener):
+    listener.backend.push(_event("a", "down", 1.0))
+    snapshot = listener.snapshot()
+    listener.backend.push(_event("a", "down", 1.5))
+    assert listener.snapshot() is snapshot
+    assert snapshot.held_for("a", now=2.0) == 1.0
+
+
+def test_keypad_key_does_not_hide_the_main_key(listener):
+    push = listener.backend.push
+    push(_event("up", "down", 1.0))
+    push(_event("up", "down", 2.0, is_keypad=True))
+    push(_event("up", "up", 3.0, is_keypad=True))
+    snapshot = listener.snapshot()
+    assert snapshot.is_down("up") and snapshot.is_down("up", is_keypad=False)
+    assert snapshot.is_up("up", is_keypad=True)
+    assert snapshot.pressed == ["up"]
+    assert snapshot.held_for("up", now=4.0) == 3.0
+    push(_event("up", "down", 3.5, is_keypad=True))
+    snapshot = listener.snapshot()
+    assert sorted(snapshot.pressed) == ["up", "up[kp]"]
+    assert snapshot.held_for("up", now=4.0) == 3.0  # the longest held
+    assert snapshot.held_for("up", now=4.0, is_keypad=True) == 0.5
+
+
+def test_bound_main_and_keypad_keys(listener):
+    listener.bind_hotkey("enter", lambda: None)
+    listener.bind_hotkey("enter[kp]", lambda: None)
+    listener.backend.push(_event("enter", "down", 1.0, is_keypad=True))
+    snapshot = listener.snapshot()
+    assert snapshot.is_down("enter", is_keypad=True)
+    assert not snapshot.is_down("enter", is_keypad=False)
+    assert snapshot.pressed == ["enter[kp]"]
+
+
+def test_modifier_mask(listener):
+    listener.backend.push(_event("ctrl", "down", 1.0))
+    listener.backend.push(_event("a", "down", 1.0))
+    snapshot = listener.snapshot()
+    assert snapshot.modifier_mask == snapshot.mask("ctrl")
+    assert snapshot.pressed_mask == snapshot.mask("ctrl") | snapshot.mask("a")
+
+
+def test_evicted_keys_leave_the_snapshot():
+    listener = KeyboardListener(registry=KeyRegistry(max_event_keys=4, key_idle_time=0), backend=MemoryBackend())
+    listener.backend.push(_event("ctrl", "down", 1.0))
+    for i in range(12):
+        name = f"x{i}"
+        listener.backend.push(MemoryBackend.make_event(name, "down", 500 + i, 2.0 + i))
+        listener.backend.push(MemoryBackend.make_event(name, "up", 500 + i, 2.0 + i))
+    snapshot = listener.snapshot()
+    assert listener.registry.evictions
+    assert snapshot.held_for("ctrl", now=2.0) == 1.0
+    assert len(snapshot.bits) == len(snapshot.last_changes) <= 5
+
+
+def test_snapshot_is_immutable():
+    with pytest.raises(AttributeError):
+        KeyStateSnapshot().pressed_mask = 1
+
+
+def test_last_changes_matches_a_dict():
+    changes, expected = LastChanges(), {}
+    kept = []
+    for i in range(2000):
+        index = i * 7 % 50
+        if i % 97 == 0:
+            changes = changes.without(index)
+            expected.pop(index, None)
+        else:
+            changes = changes.changed(index, float(i))
+            expected[index] = float(i)
+        if i % 50 == 0:
+            kept.append((changes, dict(expected)))
+    assert dict(changes) == expected
+    assert all(dict(c) == e for c, e in kept)
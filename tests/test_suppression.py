@@ -0,0 +1,95 @@
+import pytest
+from keyboard import key_to_scan_codes
+
+from keyboard_extended import KeyboardListener, KeyRegistry
+from keyboard_extended.backends import MemoryBackend
+from keyboard_extended.suppression import SuppressionState
+
+
+def _event(name: str, event_type: str = "down", device=None):
+    return MemoryBackend.make_event(name, event_type, key_to_scan_codes(name)[0], device=device)
+
+
+@pytest.fixture
+def listener():
+    listener = KeyboardListener(registry=KeyRegistry(), backend=MemoryBackend(), suppress=True)
+    yield listener
+    listener.stop_keyboard_hook()
+
+
+def _push(listener: KeyboardListener, *events) -> list[bool]:
+    "Whether each event passed the hook."
+    return [listener.backend.push(e) for e in events]
+
+
+def test_press_repeat_and_release_of_the_trigger_are_suppressed(listener):
+    listener.bind_hotkey("ctrl+k", lambda: None, suppress=True)
+    passed = _push(listener, _event("ctrl"), _event("k"), _event("k"), _event("k", "up"), _event("ctrl", "up"))
+    assert passed == [True, False, False, False, True]
+
+
+def test_trigger_without_its_modifiers_passes(listener):
+    listener.bind_hotkey("ctrl+k", lambda: None, suppress=True)
+    assert _push(listener, _event("k"), _event("k", "up")) == [True, True]
+
+
+def test_repeats_of_a_press_that_passed_pass(listener):
+    listener.bind_hotkey("ctrl+k", lambda: None, suppress=True)
+    passed = _push(listener, _event("k"), _event("ctrl"), _event("k"), _event("k", "up"), _event("k"))
+    assert passed == [True, True, True, True, False]
+
+
+def test_other_modifier_held_lets_the_trigger_pass(listener):
+    listener.bind_hotkey("ctrl+k", lambda: None, suppress=True)
+    assert _push(listener, _event("ctrl"), _event("shift"), _event("k")) == [True, True, True]
+
+
+def test_suppressed_hotkey_still_fires():
+    fired = []
+    listener = KeyboardListener(registry=KeyRegistry(), backend=MemoryBackend(), suppress=True)
+    listener.bind_hotkey("ctrl+k", lambda: fired.append(1), suppress=True, max_delay=60)
+    _push(listener, _event("ctrl"), _event("k"))
+    listener.stop_keyboard_hook()  # handles the queued events
+    assert fired == [1]
+
+
+def test_decide_tracks_state_per_listener():
+    registry = KeyRegistry()
+    listener = KeyboardListener(registry=registry, backend=MemoryBackend(), start_listening=False)
+    listener.bind_hotkey("ctrl+k", lambda: None, suppress=True)
+    table, state = registry.suppression, SuppressionState()
+    assert [table.decide(e, state) for e in (_event("ctrl"), _event("k"))] == [False, True]
+    assert state.suppressed_mask and state.pressed_mask
+    assert table.decide(_event("k", "up"), state)
+    assert not state.suppressed_mask
+
+
+@pytest.mark.parametrize(
+    "hotkey, kwargs", [("ctrl+k", {"device": "kbd1"}), ("ctrl+k[dev=kbd1]", {}), ("ctrl[dev=kbd1]+k", {})]
+)
+def test_suppress_rejects_devices(listener, hotkey, kwargs):
+    with pytest.raises(ValueError):
+        listener.bind_hotkey(hotkey, lambda: None, suppress=True, **kwargs)
+    assert not listener.registry.suppression
+
+
+def test_device_binding_next_to_suppressing_binding():
+    "A device binding of the same keys neither suppresses other devices nor stops the suppressing binding."
+    fired = []
+    listener = KeyboardListener(registry=KeyRegistry(), backend=MemoryBackend(), suppress=True)
+    listener.bind_hotkey("ctrl+k", lambda: fired.append("kbd1"), device="kbd1", max_delay=60)
+    listener.bind_hotkey("ctrl+j", lambda: fired.append("any"), suppress=True, max_delay=60)
+    passed = _push(
+        listener,
+        _event("ctrl", device="kbd2"),
+        _event("k", device="kbd2"),
+        _event("k", "up", device="kbd2"),
+        _event("ctrl", "up", device="kbd2"),
+        _event("ctrl", device="kbd1"),
+        _event("k", device="kbd1"),
+        _event("k", "up", device="kbd1"),
+        _event("j", device="kbd1"),
+    )
+    listener.stop_keyboard_hook()
+    assert passed == [True, True, True, True, True, True, True, False]
+    assert fired == ["kbd1", "any"]